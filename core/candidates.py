@@ -0,0 +1,126 @@
+import numpy as np
+from scipy import sparse
+from .scoring import alias_overlap
+
+DEFAULT_TOP_TERMS = 20
+DEFAULT_MAX_CANDIDATES = 200
+DEFAULT_MAX_DF = 0.5
+PRUNED_BLOCK_SIZE = 128
+
+
+def _row_ranks(rows, keys):
+    """
+    Order entries by (row, -key) and give each its 0-based rank within its row.
+    `rows` must be non-decreasing (CSR order). Returns (order, rank).
+    """
+    order = np.lexsort((-keys, rows))
+    starts = np.searchsorted(rows, rows[order], side='left')
+    return order, np.arange(len(order)) - starts
+
+
+def keep_top_terms(X, t: int):
+    """Copy of CSR X keeping only the t largest entries of each row."""
+    X = sparse.csr_matrix(X)
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    order, rank = _row_ranks(rows, X.data)
+    keep = order[rank < t]
+    return sparse.csr_matrix((X.data[keep], (rows[keep], X.indices[keep])), shape=X.shape)
+
+
+def drop_common(X, max_df: float):
+    """Zero the columns present in more than max_df of the rows (unselective postings)."""
+    X = sparse.csc_matrix(X)
+    df = np.diff(X.indptr) / max(X.shape[0], 1)
+    keep = sparse.diags((df <= max_df).astype(X.dtype))
+    return (X @ keep).tocsr()
+
+
+class CandidateIndex:
+    """
+    Inverted index (posting × movie) over movie genres, aliases and each
+    movie's `top_terms` strongest TF-IDF terms, weighted like the final score.
+
+    A game's candidates are the movies with the highest partial score over
+    those postings; only candidates are rescored exactly. Postings shared by
+    more than `max_df` of the catalog are left out of candidate generation.
+    top_terms, max_df and the per-game candidate count are the recall-vs-speed
+    knobs.
+    """
+
+    def __init__(self, mats: dict, alpha: float, beta: float,
+                 top_terms: int = DEFAULT_TOP_TERMS, max_df: float = DEFAULT_MAX_DF):
+        self.alpha, self.beta = alpha, beta
+        # movie-major copies for rescoring candidate columns
+        self.M = {t: mats[f'M_{t}_T'].T.tocsr() for t in ('genre', 'text', 'alias')}
+        P = sparse.hstack([
+            alpha * drop_common(self.M['genre'], max_df),
+            (1 - alpha) * drop_common(keep_top_terms(self.M['text'], top_terms), max_df),
+            beta * drop_common(self.M['alias'], max_df),
+        ]).tocsr()
+        P.eliminate_zeros()
+        self.postings = P.T.tocsr()   # posting × movie
+        self.n_movies = P.shape[0]
+
+    def candidates(self, G_genre, G_text, G_alias, max_candidates: int):
+        """
+        (rows, cols) of each game's best `max_candidates` movies, sorted by row.
+        Partial scores stay sparse and each game's candidates are picked among
+        its own nonzeros, so the cost follows the movies it shares a posting
+        with rather than the catalog size.
+        """
+        # alias bonus is 0/1 per pair, so a game's alias weights sum to 1 rather than counting overlaps
+        n_alias = np.asarray(G_alias.sum(axis=1)).ravel()
+        n_alias[n_alias == 0] = 1.0
+        Q = sparse.hstack([G_genre, G_text, sparse.diags(1.0 / n_alias) @ G_alias]).tocsr()
+        # sparse partial scores: a game's work follows the movies sharing a posting with it
+        C = (Q @ self.postings).tocsr()
+        C.eliminate_zeros()
+        row_nnz = np.diff(C.indptr)
+        rows = np.repeat(np.arange(C.shape[0]), row_nnz)
+        # rows within the budget keep all their nonzeros
+        few = (row_nnz <= max_candidates)[rows]
+        rows, cols = [rows[few]], [C.indices[few]]
+        heavy = np.flatnonzero(row_nnz > max_candidates)
+        for r in heavy:
+            # rows over budget: partial selection among their own nonzeros
+            lo, hi = C.indptr[r], C.indptr[r + 1]
+            best = np.argpartition(-C.data[lo:hi], max_candidates - 1)[:max_candidates]
+            rows.append(np.full(max_candidates, r))
+            cols.append(C.indices[lo:hi][best])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        order = np.argsort(rows, kind='stable')
+        return rows[order], cols[order].astype(np.int64)
+
+    def rescore(self, G_genre, G_text, G_alias, rows, cols):
+        """Exact combined score of each (game row, movie col) pair."""
+        union = np.unique(cols)
+        pos = np.searchsorted(union, cols)
+        S = self.alpha * (G_genre @ self.M['genre'][union].T).toarray()
+        S += (1 - self.alpha) * (G_text @ self.M['text'][union].T).toarray()
+        if self.beta:
+            S += self.beta * alias_overlap(G_alias, self.M['alias'][union].T)
+        return S[rows, pos]
+
+
+def score_range_pruned(mats: dict, index: CandidateIndex, start: int, stop: int,
+                       top_k: int, block_size: int = PRUNED_BLOCK_SIZE,
+                       max_candidates: int = DEFAULT_MAX_CANDIDATES):
+    """
+    Candidate-pruned counterpart of core.scoring.score_range, same yields.
+    Blocks stay small so the union of candidate movies stays small too;
+    rows with fewer than top_k candidates are padded with score 0.
+    """
+    for b_start in range(start, stop, block_size):
+        b_stop = min(b_start + block_size, stop)
+        blk = [mats[name][b_start:b_stop] for name in ('G_genre', 'G_text', 'G_alias')]
+        rows, cols = index.candidates(*blk, max_candidates)
+        scores = index.rescore(*blk, rows, cols)
+
+        n, k = b_stop - b_start, min(top_k, index.n_movies)
+        top_idx = np.zeros((n, k), dtype=np.int64)
+        top_val = np.zeros((n, k), dtype=scores.dtype)
+        order, rank = _row_ranks(rows, scores)
+        hit = rank < k
+        top_idx[rows[order[hit]], rank[hit]] = cols[order[hit]]
+        top_val[rows[order[hit]], rank[hit]] = scores[order[hit]]
+        yield b_start, b_stop, top_idx, top_val
@@ -1,11 +1,128 @@
-from sqlalchemy import create_engine
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
+import time
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=False)
+# Engine settings per workload. "pool" applies to server databases,
+# "postgresql" to create_engine on PostgreSQL, "sqlite" are PRAGMAs set on
+# every new SQLite connection.
+ENGINE_PROFILES = {
+    # pipeline steps: a single writer sending large multi-row statements
+    "bulk": {
+        "pool": {"pool_size": 2, "max_overflow": 0},
+        "postgresql": {
+            "executemany_mode": "values_plus_batch",   # batched UPDATE/DELETE executemany too
+            "executemany_batch_page_size": 1000,
+            "insertmanyvalues_page_size": 5000,
+        },
+        "sqlite": {"journal_mode": "WAL", "synchronous": "NORMAL",
+                   "cache_size": -262144, "temp_store": "MEMORY"},
+    },
+    # online lookups (get_recs): more connections, dropped connections replaced
+    "serving": {
+        "pool": {"pool_size": 10, "max_overflow": 10, "pool_pre_ping": True,
+                 "pool_recycle": 1800},
+        "postgresql": {},
+        "sqlite": {"journal_mode": "WAL", "synchronous": "NORMAL",
+                   "cache_size": -65536, "mmap_size": 2**28},
+    },
+    # ad-hoc use: SQLAlchemy's defaults
+    "local": {"pool": {}, "postgresql": {}, "sqlite": {}},
+}
+# options only the psycopg2 driver understands
+PSYCOPG2_ONLY = ("executemany_mode", "executemany_batch_page_size")
+ENGINE_PROFILE = os.getenv("ENGINE_PROFILE", "local")
+ID_CHUNK = 500   # values per IN (...) clause
+
+
+def make_engine(profile: str = None, url: str = None):
+    """Engine for `url` (default: DATABASE_URL) tuned by one of ENGINE_PROFILES."""
+    profile = profile or ENGINE_PROFILE
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile {profile!r}; "
+                         f"choose from {', '.join(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+    url = make_url(url or DATABASE_URL)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        engine = create_engine(url, echo=False)
+        pragmas = settings["sqlite"]
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+        return engine
+
+    kw = dict(settings["pool"])
+    if backend == "postgresql":
+        kw.update({k: v for k, v in settings["postgresql"].items()
+                   if url.get_driver_name() == "psycopg2" or k not in PSYCOPG2_ONLY})
+    return create_engine(url, echo=False, **kw)
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
+
+
+def use_profile(profile: str):
+    """
+    Rebind SessionLocal (and core.db.engine) to an engine tuned for `profile`.
+    Scripts call this first thing in main(); returns the new engine.
+    """
+    global engine
+    engine.dispose()
+    engine = make_engine(profile)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def chunked(values, size: int = ID_CHUNK):
+    """Consecutive slices of `values`, each small enough for one IN (...) clause."""
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class QueryStats(Counter):
+    """SQL statements run, by verb, plus `seconds` spent executing them."""
+    seconds = 0.0
+
+
+@contextmanager
+def count_queries(bind=Engine):
+    """
+    Count and time the SQL statements run on `bind` inside the block. The
+    default listens on every engine, so it keeps working across use_profile().
+    """
+    stats = QueryStats()
+    key = ('query_start', id(stats))   # nested count_queries() keep their own clocks
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        stats[statement.lstrip().split(None, 1)[0].upper()] += 1
+        conn.info.setdefault(key, []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(key)
+        if starts:
+            stats.seconds += time.perf_counter() - starts.pop()
+
+    event.listen(bind, 'before_cursor_execute', before)
+    event.listen(bind, 'after_cursor_execute', after)
+    try:
+        yield stats
+    finally:
+        event.remove(bind, 'before_cursor_execute', before)
+        event.remove(bind, 'after_cursor_execute', after)
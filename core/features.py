@@ -0,0 +1,267 @@
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy import sparse
+from dotenv import load_dotenv
+
+load_dotenv()
+FORMAT_VERSION = 1
+# FEATURE_STORE points builders and scorers at a side store (e.g. a float64 reference)
+STORE_DIR = os.path.abspath(os.getenv('FEATURE_STORE') or
+                            os.path.join(os.path.dirname(__file__), '..', 'data', 'features'))
+MANIFEST = 'manifest.json'
+SIDES = ('game', 'movie')
+# precision of stored float features and of scoring; FEATURE_DTYPE=float64 keeps full precision
+FEATURE_DTYPE = np.dtype(os.getenv('FEATURE_DTYPE', 'float32'))
+INDEX_DTYPE = np.int32
+
+
+def _save_npy(path: str, arr):
+    # write-then-rename, so processes that have the old file mapped keep a valid view
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, np.ascontiguousarray(arr))
+    os.replace(tmp, path)
+
+
+def save_csr(directory: str, name: str, X):
+    """Write a CSR matrix as raw .npy parts so other processes can memory-map it."""
+    X = sparse.csr_matrix(X)
+    for part in ('data', 'indices', 'indptr'):
+        _save_npy(os.path.join(directory, f'{name}.{part}.npy'), getattr(X, part))
+    _save_npy(os.path.join(directory, f'{name}.shape.npy'), np.asarray(X.shape))
+
+
+def load_csr(directory: str, name: str, mmap_mode: str = 'r'):
+    """Counterpart of save_csr; the arrays stay backed by the page cache."""
+    parts = [np.load(os.path.join(directory, f'{name}.{part}.npy'), mmap_mode=mmap_mode)
+             for part in ('data', 'indices', 'indptr')]
+    shape = tuple(np.load(os.path.join(directory, f'{name}.shape.npy')))
+    return sparse.csr_matrix(tuple(parts), shape=shape, copy=False)
+
+
+def compact(X, dtype=None):
+    """
+    X with float values as `dtype` (default FEATURE_DTYPE) and, for sparse
+    matrices, int32 indices when they fit. Non-float features (flags) are returned as is.
+    """
+    dtype = np.dtype(dtype or FEATURE_DTYPE)
+    if not np.issubdtype(X.dtype, np.floating):
+        return X
+    if not sparse.issparse(X):
+        return np.asarray(X, dtype=dtype)
+    X = sparse.csr_matrix(X, dtype=dtype)
+    if X.nnz < np.iinfo(INDEX_DTYPE).max:
+        X.indices = X.indices.astype(INDEX_DTYPE, copy=False)
+        X.indptr  = X.indptr.astype(INDEX_DTYPE, copy=False)
+    return X
+
+
+def reindex(X, src_ids, dst_ids):
+    """
+    Move the rows of X (one per id in src_ids) to their position in the sorted
+    dst_ids index. Rows for ids absent from src_ids are empty (sparse) or zero (dense).
+    """
+    src_ids = np.asarray(src_ids, dtype=np.int64)
+    dst_ids = np.asarray(dst_ids, dtype=np.int64)
+    if np.array_equal(src_ids, dst_ids):
+        return X
+    pos = np.searchsorted(dst_ids, src_ids)
+    if sparse.issparse(X):
+        P = sparse.csr_matrix(
+            (np.ones(len(pos), dtype=X.dtype), (pos, np.arange(len(pos)))),
+            shape=(len(dst_ids), len(src_ids))
+        )
+        return (P @ X).tocsr()
+    out = np.zeros((len(dst_ids),) + X.shape[1:], dtype=X.dtype)
+    out[pos] = X
+    return out
+
+
+class FeatureStore:
+    """
+    Versioned on-disk store for per-entity features (genre, text, alias, flags).
+
+    Every feature of a side ('game' / 'movie') has one row per id of that
+    side's sorted id index, so features line up without any id juggling.
+    Matrices are kept as .npy files (CSR parts for sparse features) and are
+    memory-mapped on load; builder metadata (genre index, idf, alias names…)
+    lives in manifest.json. The ids each feature was actually built for are
+    kept next to it ({side}.{name}.built.npy): rows of other ids are only
+    padding from the shared index, and a built row can still be empty.
+    """
+
+    def __init__(self, path: str = STORE_DIR):
+        self.path = path
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        fn = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(fn):
+            return {'version': FORMAT_VERSION, 'ids': {},
+                    'features': {side: {} for side in SIDES}, 'meta': {}}
+        with open(fn) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(
+                f"Feature store {self.path} has format version {manifest.get('version')}, "
+                f"expected {FORMAT_VERSION}; rebuild the features."
+            )
+        return manifest
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def ids(self, side: str):
+        if side not in self.manifest['ids']:
+            return np.empty(0, dtype=np.int64)
+        return np.load(os.path.join(self.path, f'{side}.ids.npy'), mmap_mode='r')
+
+    def has(self, side: str, name: str) -> bool:
+        return name in self.manifest['features'][side]
+
+    def get(self, side: str, name: str):
+        if not self.has(side, name):
+            raise KeyError(f"Feature '{name}' for {side}s not found in {self.path}; run its builder first.")
+        fname = f'{side}.{name}'
+        if self.manifest['features'][side][name]['kind'] == 'csr':
+            return load_csr(self.path, fname)
+        return np.load(os.path.join(self.path, fname + '.npy'), mmap_mode='r')
+
+    def built_ids(self, side: str, name: str):
+        """Sorted ids the feature was written for, empty rows included."""
+        path = os.path.join(self.path, f'{side}.{name}.built.npy')
+        if os.path.exists(path):
+            return np.load(path)
+        # stores written before built ids were kept: rows with any value
+        X, index = self.get(side, name), np.asarray(self.ids(side))
+        if sparse.issparse(X):
+            return index[np.diff(X.indptr) > 0]
+        return index
+
+    def meta(self, name: str) -> dict:
+        return self.manifest['meta'].get(name, {})
+
+    # ── writing ──────────────────────────────────────────────────────────
+    def put(self, side: str, name: str, X, ids, meta: dict = None):
+        """
+        Store feature `name` for the entities `ids` (one per row of X).
+        New ids grow the side's index; existing features are realigned to it.
+        Float features are stored as FEATURE_DTYPE.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        ids, X = ids[order], X[order]
+
+        new_index = self._grow_index(side, name, ids)
+        self._write(side, name, reindex(X, ids, new_index))
+        self._save_built(side, name, ids)
+        if meta is not None:
+            self.manifest['meta'][name] = meta
+        self._write_manifest()
+
+    def put_rows(self, side: str, name: str, X, ids):
+        """Replace (or add) the rows of `ids` in an existing feature; other rows are kept."""
+        ids = np.asarray(ids, dtype=np.int64)
+        index = np.asarray(self.ids(side))
+        keep = ~np.isin(index, ids)
+        built = np.union1d(self.built_ids(side, name), ids)
+        old = self.get(side, name)
+        if sparse.issparse(X):
+            merged = sparse.vstack([old[np.flatnonzero(keep)],
+                                    sparse.csr_matrix(X, dtype=old.dtype)]).tocsr()
+        else:
+            merged = np.concatenate([old[keep], np.asarray(X, dtype=old.dtype)])
+        self.put(side, name, merged, np.concatenate([index[keep], ids]))
+        self._save_built(side, name, built)
+
+    def set_meta(self, name: str, meta: dict):
+        self.manifest['meta'][name] = meta
+        self._write_manifest()
+
+    def put_chunks(self, side: str, name: str, ids, chunks, n_cols: int, nnz: int,
+                   meta: dict = None):
+        """
+        Streamed counterpart of put for a sparse float feature. `ids` must be
+        sorted and unique; `chunks` yields their CSR rows in that order, a block
+        at a time, with `nnz` entries in total. Rows go straight into
+        memory-mapped .npy parts, so the matrix is never held whole.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        ids = np.asarray(ids, dtype=np.int64)
+        new_index = self._grow_index(side, name, ids)
+        rows = np.searchsorted(new_index, ids)
+        index_dtype = INDEX_DTYPE if nnz < np.iinfo(INDEX_DTYPE).max else np.int64
+
+        fname = f'{side}.{name}'
+        paths = {part: os.path.join(self.path, f'{fname}.{part}.npy') for part in ('data', 'indices')}
+        data = open_memmap(paths['data'] + '.tmp', mode='w+', dtype=FEATURE_DTYPE, shape=(nnz,))
+        indices = open_memmap(paths['indices'] + '.tmp', mode='w+', dtype=index_dtype, shape=(nnz,))
+        row_nnz = np.zeros(len(new_index), dtype=np.int64)
+        at = done = 0
+        for X in chunks:
+            X = sparse.csr_matrix(X)
+            data[at:at + X.nnz] = X.data
+            indices[at:at + X.nnz] = X.indices
+            row_nnz[rows[done:done + X.shape[0]]] = np.diff(X.indptr)
+            at, done = at + X.nnz, done + X.shape[0]
+        if (at, done) != (nnz, len(ids)):
+            raise ValueError(f"Chunks of '{name}' held {done} rows / {at} entries, "
+                             f"expected {len(ids)} / {nnz}")
+        data.flush()
+        indices.flush()
+        del data, indices
+        for part, path in paths.items():
+            os.replace(path + '.tmp', path)
+        # ids absent from `ids` get empty rows
+        indptr = np.concatenate([[0], np.cumsum(row_nnz)]).astype(index_dtype)
+        _save_npy(os.path.join(self.path, f'{fname}.indptr.npy'), indptr)
+        _save_npy(os.path.join(self.path, f'{fname}.shape.npy'), np.asarray((len(new_index), n_cols)))
+        self._save_built(side, name, ids)
+
+        self.manifest['features'][side][name] = {
+            'kind': 'csr', 'shape': [len(new_index), n_cols], 'dtype': str(FEATURE_DTYPE)
+        }
+        if meta is not None:
+            self.manifest['meta'][name] = meta
+        self._write_manifest()
+
+    def _grow_index(self, side: str, name: str, ids):
+        """Add `ids` to the side's index, realigning every other feature; returns the index."""
+        index = np.asarray(self.ids(side))
+        new_index = np.union1d(index, ids)
+        if len(new_index) != len(index):
+            for other in list(self.manifest['features'][side]):
+                if other != name:
+                    self._write(side, other, reindex(self.get(side, other), index, new_index))
+            _save_npy(os.path.join(self.path, f'{side}.ids.npy'), new_index)
+            self.manifest['ids'][side] = len(new_index)
+        return new_index
+
+    def _save_built(self, side: str, name: str, ids):
+        _save_npy(os.path.join(self.path, f'{side}.{name}.built.npy'),
+                  np.unique(np.asarray(ids, dtype=np.int64)))
+
+    def _write(self, side: str, name: str, X):
+        fname = f'{side}.{name}'
+        X = compact(X)
+        if sparse.issparse(X):
+            # canonical CSR (sorted, no duplicates): reindex's product leaves indices unsorted
+            if not X.has_canonical_format:
+                X = X.copy()
+                X.sum_duplicates()
+            save_csr(self.path, fname, X)
+            kind = 'csr'
+        else:
+            X = np.asarray(X)
+            _save_npy(os.path.join(self.path, fname + '.npy'), X)
+            kind = 'dense'
+        self.manifest['features'][side][name] = {
+            'kind': kind, 'shape': list(X.shape), 'dtype': str(X.dtype)
+        }
@@ -0,0 +1,351 @@
+import re
+import ast
+import csv
+import os
+import json
+import mmap
+import hashlib
+from collections import deque
+import numpy as np
+import pandas as pd
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import Genre
+
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def insert_ignore(session, table, rows) -> int:
+    """
+    Bulk INSERT of `rows` (dicts) into a Core table, skipping rows that hit
+    an existing key (ON CONFLICT DO NOTHING). PostgreSQL and SQLite only.
+    """
+    if not rows:
+        return 0
+    dialect = session.get_bind().dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported for {dialect}")
+    session.execute(UPSERT_DIALECTS[dialect](table).on_conflict_do_nothing(), rows)
+    return len(rows)
+
+
+def record_hash(rec: dict) -> str:
+    """
+    Content hash of an ingest record: its typed fields plus its dimension
+    names (order-insensitive). 'label', 'hash', 'error' and 'offset' are not content.
+    """
+    fields = {k: v for k, v in rec.items()
+              if k not in ('label', 'hash', 'error', 'offset', 'dims')}
+    dims = {model.__name__: sorted(names) for model, names in rec.get('dims', {}).items()}
+    payload = json.dumps([fields, dims], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class DimensionCache:
+    """
+    In-memory name → row maps for the lookup tables (genres, developers, …),
+    preloaded once per ingest. Names not seen yet are added per batch and go
+    out in the batch's flush, so resolving a row's dimensions costs no queries.
+    Genres are matched case-insensitively, like the old `ilike` lookup.
+
+    Use with a session created with expire_on_commit=False, so the cached
+    rows stay usable across batch commits.
+    """
+
+    def __init__(self, session, models):
+        self.session = session
+        self.rows = {
+            model: {self.key(model, obj.name): obj for obj in session.query(model)}
+            for model in models
+        }
+
+    @staticmethod
+    def key(model, name: str) -> str:
+        return name.lower() if model is Genre else name
+
+    def add(self, model, names) -> int:
+        """Queue the names that have no row yet; returns how many were new."""
+        rows = self.rows[model]
+        new = {}
+        for name in names:
+            k = self.key(model, name)
+            if k not in rows and k not in new:
+                new[k] = model(name=name)
+        self.session.add_all(new.values())
+        rows.update(new)
+        return len(new)
+
+    def get(self, model, name: str):
+        return self.rows[model].get(self.key(model, name))
+
+
+# ── columnar parsing helpers ─────────────────────────────────────────────
+# formats tried (vectorized) before falling back to dateutil, most common first
+DATE_FORMATS = ("%b %d, %Y", "%d %b, %Y", "%B %d, %Y", "%Y-%m-%d", "%b %Y", "%B %Y", "%Y")
+LIST_ITEM = re.compile(r"""'([^'\\]*)'|"([^"\\]*)\"""")
+
+
+class YearParser:
+    """
+    Release years of a column of date strings. Each distinct string is parsed
+    once: pd.to_datetime runs one explicit format at a time over the strings
+    not matched yet, and only what no format matches goes to `fallback`
+    (the row path's dateutil parser). Results are cached across chunks.
+    """
+
+    def __init__(self, fallback, formats=DATE_FORMATS):
+        self.fallback = fallback
+        self.formats = formats
+        self.cache = {}
+
+    def __call__(self, values: pd.Series) -> np.ndarray:
+        todo = pd.Series([v for v in pd.unique(values) if v not in self.cache], dtype=object)
+        for fmt in self.formats:
+            if todo.empty:
+                break
+            parsed = pd.to_datetime(todo, format=fmt, errors='coerce')
+            ok = parsed.notna().to_numpy()
+            self.cache.update(zip(todo[ok], parsed[ok].dt.year.astype(int)))
+            todo = todo[~ok]
+        for v in todo:
+            self.cache[v] = self.fallback(v)
+        return values.map(self.cache).to_numpy(dtype=np.int64)
+
+
+def parse_list(s: str, fallback=ast.literal_eval) -> list:
+    """
+    Items of a "['a', 'b']" list-of-strings cell without running the Python
+    parser. Cells with escapes or non-string items go through `fallback`.
+    """
+    s = s.strip()
+    if not (s.startswith('[') and s.endswith(']')) or '\\' in s:
+        return fallback(s)
+    items = [a or b for a, b in LIST_ITEM.findall(s)]
+    # anything left besides the quoted items, commas and spaces → not a plain list
+    if LIST_ITEM.sub('', s[1:-1]).replace(',', '').strip():
+        return fallback(s)
+    return items
+
+
+def map_unique(values: pd.Series, fn) -> list:
+    """fn applied once per distinct value of a column, as a list in row order."""
+    lookup = {v: fn(v) for v in pd.unique(values)}
+    return [lookup[v] for v in values]
+
+
+# ── byte-level CSV reading: record boundaries, ranges, checkpoints ───────
+def _next_record(mm, pos: int, quotes: int):
+    """
+    First record boundary at or after `pos`: just past a newline that sits
+    outside quoted fields. `quotes` is the number of '"' before `pos`.
+    Returns (boundary, quotes before it).
+    """
+    while True:
+        nl = mm.find(b'\n', pos)
+        if nl == -1:
+            return len(mm), quotes + mm[pos:].count(b'"')
+        quotes += mm[pos:nl].count(b'"')
+        if quotes % 2 == 0:
+            return nl + 1, quotes
+        pos = nl + 1
+
+
+def csv_header(path: str):
+    """(header fields, byte offset of the first data record) of a CSV file."""
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            return [], 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end, _ = _next_record(mm, 0, 0)
+            return next(csv.reader([mm[:header_end].decode('utf-8')])), header_end
+
+
+def record_ranges(path: str, n_chunks: int, start: int = None):
+    """
+    Split a CSV file into about `n_chunks` byte ranges that each start and end
+    on a record boundary, so quoted multi-line fields are never cut.
+    `start` (a record boundary) defaults to the first data record.
+    Returns (header fields, [(start, stop), …]); the ranges cover every data row.
+    """
+    header, header_end = csv_header(path)
+    size = os.path.getsize(path)
+    start = header_end if start is None else start
+    if start >= size:
+        return header, []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # only quote parity matters, and it is even at a record boundary
+        quotes = 0
+        step = max(1, (size - start) // max(n_chunks, 1))
+        bounds = [start]
+        while bounds[-1] + step < size:
+            target = bounds[-1] + step
+            b, quotes = _next_record(mm, target, quotes + mm[bounds[-1]:target].count(b'"'))
+            if b >= size:
+                break
+            bounds.append(b)
+    return header, list(zip(bounds, bounds[1:] + [size]))
+
+
+def read_blocks(path: str, start: int, stop: int = None, size: int = 500):
+    """
+    Blocks of up to `size` CSV records between byte offsets start..stop (both
+    record boundaries), as (text, [end offset of each record]). Blank lines
+    between records are skipped, like csv.DictReader and pandas do.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        pos, quotes = start, 0
+        lines, offsets = [], []
+        for line in f:
+            if stop is not None and pos >= stop:
+                break
+            pos += len(line)
+            if not quotes and not line.strip(b'\r\n'):
+                continue
+            lines.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0:
+                quotes = 0
+                offsets.append(pos)
+                if len(offsets) == size:
+                    yield b''.join(lines).decode('utf-8'), offsets
+                    lines, offsets = [], []
+        if lines:
+            # an unterminated quote at the end of the file still ends a record
+            if quotes:
+                offsets.append(pos)
+            yield b''.join(lines).decode('utf-8'), offsets
+
+
+def file_fingerprint(path: str, sample: int = 2**20) -> str:
+    """Cheap identity of a source file: its size plus its first and last `sample` bytes."""
+    h = hashlib.blake2b(digest_size=16)
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(sample))
+        f.seek(max(size - sample, 0))
+        h.update(f.read(sample))
+    return h.hexdigest()
+
+
+class Checkpoint:
+    """
+    Last committed byte offset per source file, in one JSON file. A saved
+    offset is only handed back while the source keeps the same fingerprint.
+    `rows` counts the records written up to the resumed offset and `changes`
+    holds their new/changed report (see load_data.new_changes), so a resumed
+    run still reports what was committed before the interruption.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.name = os.path.basename(source)
+        self.fingerprint = file_fingerprint(source)
+        self.rows = 0
+        self.changes = None
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def load(self):
+        """Offset to resume from, or None when there is no usable checkpoint."""
+        entry = self._read().get(self.name)
+        if entry and entry.get('fingerprint') == self.fingerprint:
+            self.rows = entry['rows']
+            self.changes = entry.get('changes')
+            return entry['offset']
+        return None
+
+    def save(self, offset: int, rows: int, changes: dict = None):
+        state = self._read()
+        state[self.name] = {'fingerprint': self.fingerprint, 'offset': offset, 'rows': rows,
+                            'changes': changes}
+        self._write(state)
+
+    def clear(self):
+        """Forget this source's offset, once its run has been reported in full."""
+        state = self._read()
+        if state.pop(self.name, None) is not None:
+            self._write(state)
+
+    def _write(self, state: dict):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+class ChangeLog:
+    """
+    New/changed entity ids of every load_data run, in one JSON file, kept until
+    each consumer (a builder that only redoes the delta) has acknowledged them.
+    Consumers keep a watermark: the last run sequence number they have applied.
+    Runs every known consumer has applied are dropped when a run is added.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {'runs': [], 'acks': {}}
+        with open(self.path) as f:
+            state = json.load(f)
+        if 'runs' not in state:   # single-run report of older versions
+            state = {'runs': [{'seq': 1, **state}], 'acks': {}}
+        return state
+
+    def _write(self, state: dict):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def latest(self) -> int:
+        runs = self._read()['runs']
+        return runs[-1]['seq'] if runs else 0
+
+    def append(self, changes: dict) -> int:
+        """Record one run's {kind: {'new': [...], 'changed': [...], …}}; returns its seq."""
+        state = self._read()
+        seq = (state['runs'][-1]['seq'] if state['runs'] else 0) + 1
+        if state['acks']:
+            applied = min(state['acks'].values())
+            state['runs'] = [run for run in state['runs'] if run['seq'] > applied]
+        state['runs'].append({'seq': seq, **changes})
+        self._write(state)
+        return seq
+
+    def pending(self, consumer: str, kind: str) -> set:
+        """Ids of `kind` new or changed by the runs `consumer` has not acknowledged."""
+        state = self._read()
+        since = state['acks'].get(consumer, 0)
+        ids = set()
+        for run in state['runs']:
+            if run['seq'] > since:
+                entry = run.get(kind, {})
+                ids.update(entry.get('new', []) + entry.get('changed', []))
+        return ids
+
+    def ack(self, consumer: str, seq: int):
+        """`consumer` has applied every run up to `seq`."""
+        state = self._read()
+        state['acks'][consumer] = seq
+        self._write(state)
+
+
+def ordered_map(pool, fn, items, ahead: int):
+    """
+    pool.imap with at most `ahead` tasks in flight: results come back in input
+    order, and a slow consumer does not let finished results pile up.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(fn, (item,)))
+        if len(pending) >= ahead:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import resource
+from collections import Counter
+from contextlib import contextmanager
+from .db import QueryStats, count_queries
+
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "reports"))
+# set by setup_all so every step of one pipeline run reports into the same folder
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """High-water resident set size of this process (or its reaped children), in MiB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_dir(run_id: str = None) -> str:
+    return os.path.join(REPORT_DIR, run_id or os.getenv(RUN_ID_ENV) or time.strftime("%Y%m%d-%H%M%S"))
+
+
+class Run:
+    """
+    Timing report of one script run, split into consecutive stages. Each stage
+    records its wall time, rows processed, SQL statements (by verb) and SQL
+    time, and the process's peak RSS at its end. `queries` must be a
+    count_queries() covering the run, see instrumented().
+    """
+
+    def __init__(self, name: str, queries: QueryStats):
+        self.name = name
+        self.queries = queries
+        self.started = time.time()
+        self.stages = []
+        self._open = None
+
+    def stage(self, name: str, rows: int = None) -> dict:
+        """End the current stage and start `name`; set entry["rows"] later if unknown yet."""
+        self.close()
+        entry = {"stage": name, "rows": rows}
+        self.stages.append(entry)
+        self._open = entry, time.perf_counter(), Counter(self.queries), self.queries.seconds
+        return entry
+
+    def close(self):
+        if self._open is None:
+            return
+        entry, t, verbs, sql_seconds = self._open
+        by_verb = Counter(self.queries)
+        by_verb.subtract(verbs)
+        entry.update(
+            seconds=time.perf_counter() - t,
+            peak_rss_mb=peak_rss_mb(),
+            sql_statements=sum(by_verb.values()),
+            sql_seconds=self.queries.seconds - sql_seconds,
+            sql_by_verb={verb: n for verb, n in by_verb.items() if n},
+        )
+        self._open = None
+
+    def report(self) -> dict:
+        self.close()
+        return {
+            "script": self.name,
+            "started": self.started,
+            "seconds": time.time() - self.started,
+            "peak_rss_mb": peak_rss_mb(),
+            "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "sql_statements": sum(self.queries.values()),
+            "sql_seconds": self.queries.seconds,
+            "sql_by_verb": dict(self.queries),
+            "stages": self.stages,
+        }
+
+    def save(self, directory: str = None) -> str:
+        """Write the report as <run dir>/<script>.json; returns the path."""
+        directory = directory or run_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}.json")
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+_active = None
+
+
+@contextmanager
+def instrumented(name: str):
+    """
+    Record a script run: stage() calls inside the block become its stages.
+    The report is saved even if the block fails.
+    """
+    global _active
+    with count_queries() as queries:
+        run = _active = Run(name, queries)
+        try:
+            yield run
+        finally:
+            _active = None
+            path = run.save()
+            print(f"📊 Timing report: {os.path.relpath(path)}")
+
+
+def stage(name: str, rows: int = None) -> dict:
+    """Start a stage of the active run. Outside instrumented() this records nothing."""
+    if _active is None:
+        return {}
+    return _active.stage(name, rows)
+
+
+def load_reports(directory: str) -> list:
+    """Script reports of one run folder, oldest first."""
+    reports = []
+    for fn in os.listdir(directory):
+        if fn.endswith(".json") and fn != "summary.json":
+            with open(os.path.join(directory, fn)) as f:
+                reports.append(json.load(f))
+    return sorted(reports, key=lambda r: r["started"])
+
+
+def summarize(reports: list) -> dict:
+    """Pipeline totals and per-script figures of one run folder."""
+    scripts = [{
+        "script": r["script"],
+        "seconds": r["seconds"],
+        "peak_rss_mb": max(r["peak_rss_mb"], r["children_peak_rss_mb"]),
+        "sql_statements": r["sql_statements"],
+        "sql_seconds": r["sql_seconds"],
+        "rows": {s["stage"]: s["rows"] for s in r["stages"] if s["rows"] is not None},
+    } for r in reports]
+    return {
+        "seconds": sum(s["seconds"] for s in scripts),
+        "sql_statements": sum(s["sql_statements"] for s in scripts),
+        "sql_seconds": sum(s["sql_seconds"] for s in scripts),
+        "peak_rss_mb": max((s["peak_rss_mb"] for s in scripts), default=0.0),
+        "scripts": scripts,
+    }
@@ -73,6 +73,7 @@ class Game(Base):
     is_adult       = Column(Boolean)
     is_multiplayer = Column(Boolean)
     is_tv_format   = Column(Boolean)
+    content_hash   = Column(String(32))   # hash of the source row, see load_data
 
     genres         = relationship("Genre", secondary="game_genres")
     developers     = relationship("Developer", secondary="game_developers")
@@ -88,6 +89,7 @@ class Movie(Base):
     is_adult       = Column(Boolean)
     is_multiplayer = Column(Boolean)
     is_tv_format   = Column(Boolean)
+    content_hash   = Column(String(32))   # hash of the source row, see load_data
 
     genres         = relationship("Genre", secondary="movie_genres")
     directors      = relationship("Director", secondary="movie_directors")
@@ -135,3 +137,8 @@ class Recommendation(Base):
     score    = Column(Float, index=True)
 
     __table_args__ = (UniqueConstraint('game_id','movie_id', name='_game_movie_uc'),)
+
+class RecommendationFingerprint(Base):
+    __tablename__ = 'recommendation_fingerprints'
+    game_id     = Column(Integer, ForeignKey('games.id'), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)   # hash of the game's features + scoring params
@@ -0,0 +1,184 @@
+import hashlib
+import numpy as np
+from scipy import sparse
+from .features import FeatureStore, compact
+
+DEFAULT_BLOCK_SIZE = 1024
+# text similarity inputs: sparse TF-IDF rows, or their dense LSA embedding
+# (scripts/build_text_embeddings.py)
+TEXT_FEATURES = {'tfidf': 'text', 'lsa': 'text_lsa'}
+
+
+def normalize_rows(X):
+    if not sparse.issparse(X):
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return X / norms
+    norms = np.sqrt(X.multiply(X).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    inv = sparse.diags(1.0 / norms)
+    return inv.dot(X)
+
+
+def to_dense(S):
+    return S.toarray() if sparse.issparse(S) else np.asarray(S)
+
+
+def transpose(X):
+    """X.T as CSR (sparse) or C-contiguous (dense), the layout the block products want."""
+    return X.T.tocsr() if sparse.issparse(X) else np.ascontiguousarray(X.T)
+
+
+def text_feature(store: FeatureStore, text: str = 'tfidf') -> str:
+    """
+    Feature-store name of the `text` similarity input. The LSA embedding must
+    have been projected from the current TF-IDF rows.
+    """
+    if text not in TEXT_FEATURES:
+        raise ValueError(f"Unknown text mode {text!r}; choose from {', '.join(TEXT_FEATURES)}")
+    name = TEXT_FEATURES[text]
+    if text == 'lsa' and store.has('game', name) and \
+            store.meta(name).get('text_updated_at') != store.meta('text').get('updated_at'):
+        raise ValueError("The LSA text embedding is older than the TF-IDF vectors; "
+                         "rerun scripts.build_text_embeddings.")
+    return name
+
+
+def iter_blocks(n_rows: int, block_size: int = DEFAULT_BLOCK_SIZE):
+    """Yield (start, stop) row ranges covering 0..n_rows."""
+    for start in range(0, n_rows, block_size):
+        yield start, min(start + block_size, n_rows)
+
+
+def alias_overlap(G_alias, M_alias_T):
+    """1.0 where a game and a movie share at least one alias, from one sparse product."""
+    overlap = (G_alias @ M_alias_T).toarray()
+    return (overlap > 0).astype(overlap.dtype)
+
+
+def load_matrices(store: FeatureStore = None, dtype=None, text: str = 'tfidf'):
+    """
+    Row-normalized scoring inputs from the feature store, as `dtype`
+    (default FEATURE_DTYPE) with int32 indices.
+    Only games & movies with at least one genre are scored.
+    `text` picks the text term's input (see TEXT_FEATURES); 'lsa' makes
+    G_text/M_text_T dense.
+    Returns (mats, game_ids, movie_ids); movie matrices are pre-transposed.
+    """
+    store = store or FeatureStore()
+    mats, movie_ids = load_movie_matrices(store, dtype, text)
+    G_genre   = store.get('game', 'genre')
+    game_rows = np.flatnonzero(np.diff(G_genre.indptr) > 0)
+    game_ids  = np.asarray(store.ids('game')[game_rows], dtype=np.int64)
+    mats.update({
+        'G_genre': normalize_rows(compact(G_genre[game_rows], dtype)),
+        'G_text':  normalize_rows(compact(store.get('game', text_feature(store, text))[game_rows], dtype)),
+        'G_alias': compact(store.get('game', 'alias')[game_rows], dtype),
+    })
+    return mats, game_ids, movie_ids
+
+
+def load_movie_matrices(store: FeatureStore = None, dtype=None, text: str = 'tfidf'):
+    """Movie half of load_matrices: (mats with M_*_T only, movie_ids)."""
+    store = store or FeatureStore()
+    M_genre    = store.get('movie', 'genre')
+    movie_rows = np.flatnonzero(np.diff(M_genre.indptr) > 0)
+    movie_ids  = np.asarray(store.ids('movie')[movie_rows], dtype=np.int64)
+
+    # transpose once so every block is a plain matrix product
+    mats = {
+        'M_genre_T': normalize_rows(compact(M_genre[movie_rows], dtype)).T.tocsr(),
+        'M_text_T':  transpose(normalize_rows(compact(store.get('movie', text_feature(store, text))[movie_rows], dtype))),
+        'M_alias_T': compact(store.get('movie', 'alias')[movie_rows], dtype).T.tocsr(),
+    }
+    return mats, movie_ids
+
+
+def similarity_terms(mats: dict, start: int, stop: int):
+    """Genre, text and alias-overlap blocks (dense, rows × movies) for game rows start..stop."""
+    S_genre = (mats['G_genre'][start:stop] @ mats['M_genre_T']).toarray()
+    S_text  = to_dense(mats['G_text'][start:stop] @ mats['M_text_T'])
+    A       = alias_overlap(mats['G_alias'][start:stop], mats['M_alias_T'])
+    return S_genre, S_text, A
+
+
+def score_block(G_genre, G_text, M_genre_T, M_text_T, alpha: float,
+                beta: float = 0.0, G_alias=None, M_alias_T=None):
+    """
+    Combined similarity of a block of (row-normalized) games against every movie.
+    Movie matrices are passed pre-transposed so each term is one matrix product;
+    the text term is a dense GEMM when G_text/M_text_T are LSA embeddings.
+    """
+    S = alpha * to_dense(G_genre @ M_genre_T) + (1 - alpha) * to_dense(G_text @ M_text_T)
+    if beta and G_alias is not None:
+        S += beta * alias_overlap(G_alias, M_alias_T)
+    return S
+
+
+def score_range(mats: dict, start: int, stop: int, alpha: float, beta: float,
+                top_k: int, block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    Score game rows start..stop block by block.
+    `mats` holds G_genre/G_text/G_alias and the transposed M_genre_T/M_text_T/M_alias_T.
+    Yields (block_start, block_stop, top_idx, top_val) per block.
+    """
+    for b_start in range(start, stop, block_size):
+        b_stop = min(b_start + block_size, stop)
+        S = score_block(mats['G_genre'][b_start:b_stop], mats['G_text'][b_start:b_stop],
+                        mats['M_genre_T'], mats['M_text_T'], alpha, beta,
+                        mats['G_alias'][b_start:b_stop], mats['M_alias_T'])
+        top_idx, top_val = top_k_rows(S, top_k)
+        yield b_start, b_stop, top_idx, top_val
+
+
+def canonical(X):
+    """CSR copy of X with summed duplicates and sorted indices, so equal rows hash the same."""
+    X = sparse.csr_matrix(X, copy=True)
+    X.sum_duplicates()
+    X.sort_indices()
+    return X
+
+
+def matrix_digest(*mats) -> str:
+    """Hash of whole matrices (e.g. the movie side, which every game score depends on)."""
+    h = hashlib.blake2b(digest_size=16)
+    for X in mats:
+        X = canonical(X)
+        h.update(np.asarray(X.shape, dtype=np.int64).tobytes())
+        for part in (X.indptr, X.indices, X.data):
+            h.update(np.ascontiguousarray(part).tobytes())
+    return h.hexdigest()
+
+
+def row_fingerprints(mats, salt: str = '') -> list:
+    """
+    One hex digest per row, covering that row in every matrix of `mats`
+    (all with the same row count) plus `salt` (scoring params, movie digest).
+    """
+    mats = [canonical(X) for X in mats]
+    salt = salt.encode()
+    out = []
+    for r in range(mats[0].shape[0]):
+        h = hashlib.blake2b(salt, digest_size=16)
+        for X in mats:
+            lo, hi = X.indptr[r], X.indptr[r + 1]
+            h.update(np.asarray(hi - lo, dtype=np.int64).tobytes())
+            h.update(X.indices[lo:hi].astype(np.int64).tobytes())
+            h.update(X.data[lo:hi].astype(np.float64).tobytes())
+        out.append(h.hexdigest())
+    return out
+
+
+def top_k_rows(S, k: int):
+    """
+    Per-row top-k of a dense score block via partial selection.
+    Returns (indices, scores), both shaped (rows, k) and sorted by descending score.
+    """
+    k = min(k, S.shape[1])
+    if k <= 0:
+        empty = np.empty((S.shape[0], 0), dtype=S.dtype)
+        return empty.astype(np.int64), empty
+    idx = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    vals = np.take_along_axis(S, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
@@ -0,0 +1,173 @@
+import os
+import re
+import html
+import sqlite3
+import hashlib
+import multiprocessing as mp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from .db import chunked
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'token_cache.sqlite')
+# bump when clean_text/tokenize change, so cached token streams are not reused
+TOKENIZER_VERSION = 1
+TAG = re.compile(r'<[^>]*>')
+SPACE = re.compile(r'\s+')
+# scikit-learn's default token pattern: words of 2+ characters
+TOKEN = re.compile(r'(?u)\b\w\w+\b')
+
+
+def clean_text(text: str) -> str:
+    """Description text without HTML tags or entities, whitespace collapsed."""
+    return SPACE.sub(' ', html.unescape(TAG.sub(' ', text or ''))).strip()
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens of the cleaned text, as the text vectorizers split them."""
+    return TOKEN.findall(clean_text(text).lower())
+
+
+def drop_stop_words(tokens) -> list:
+    """Tokens without English stop words, before the vectorizers build n-grams."""
+    return [t for t in tokens if t not in ENGLISH_STOP_WORDS]
+
+
+def content_tokens(text: str) -> list:
+    """tokenize() without stop words: the terms the text vectorizers count."""
+    return drop_stop_words(tokenize(text))
+
+
+def identity(x):
+    """Pass-through preprocessor/tokenizer for vectorizers fed token lists."""
+    return x
+
+
+def text_key(text: str) -> str:
+    h = hashlib.blake2b(f'{TOKENIZER_VERSION}\0{text or ""}'.encode(), digest_size=16)
+    return h.hexdigest()
+
+
+class TokenCache:
+    """
+    On-disk token streams keyed by a hash of the raw text (and TOKENIZER_VERSION),
+    in one SQLite file. Texts not cached yet are tokenized, across a pool of
+    `workers` processes when workers > 1, and stored; unchanged texts are
+    never re-tokenized.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, workers: int = 1):
+        self.path = path
+        self.workers = workers
+        self.pool = None   # started on the first miss
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, tokens TEXT)')
+        self.hits = self.misses = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        self.conn.close()
+
+    def _get(self, keys) -> dict:
+        found = {}
+        for chunk in chunked(keys):
+            marks = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(
+                f'SELECT key, tokens FROM tokens WHERE key IN ({marks})', chunk))
+        return found
+
+    def tokens(self, texts) -> list:
+        """Token list of each text, in order."""
+        keys = [text_key(t) for t in texts]
+        found = {k: v.split(' ') if v else [] for k, v in self._get(list(set(keys))).items()}
+        todo = {k: t for k, t in zip(keys, texts) if k not in found}
+        self.hits += len(keys) - sum(k in todo for k in keys)
+        self.misses += len(todo)
+        if todo:
+            if self.workers > 1:
+                self.pool = self.pool or mp.Pool(self.workers)
+                streams = self.pool.map(tokenize, todo.values(), chunksize=64)
+            else:
+                streams = [tokenize(t) for t in todo.values()]
+            new = dict(zip(todo, streams))
+            with self.conn:
+                self.conn.executemany('INSERT OR REPLACE INTO tokens VALUES (?, ?)',
+                                      [(k, ' '.join(v)) for k, v in new.items()])
+            found.update(new)
+        return [found[k] for k in keys]
+
+
+
+# keyword suffixes dropped before prefix matching → shortest stem left
+KEYWORD_SUFFIXES = (('ions', 6), ('ion', 6), ('s', 4))
+
+
+def keyword_stem(word: str) -> str:
+    """
+    `word` without a trailing "-ion(s)" or plural "s" when a long enough stem
+    remains ("infection" → "infect", "powers" → "power", but not "election"
+    → "elect"), so it prefix-matches the word's other forms ("infected", "powerful").
+    """
+    for suffix, shortest in KEYWORD_SUFFIXES:
+        if word.endswith(suffix) and not word.endswith('ss') and len(word) - len(suffix) >= shortest:
+            return word[:-len(suffix)]
+    return word
+
+
+class KeywordMatcher:
+    """
+    Alias keyword lookup ({alias: [keyword, …]}) over token streams, built once.
+    Keywords are tokenized like the texts and stemmed (keyword_stem); a keyword
+    word matches any token that starts with its stem, so inflected forms hit
+    ("haunt" in "haunted", "myth" in "mythical") but words that merely contain
+    it do not ("war" not in "software"). In phrases only the last word is
+    matched by prefix ("serial killers"). Each distinct token is looked up once
+    by its own prefixes (and remembered) and phrases are only checked where
+    their first word matches, so the cost does not grow with the number of
+    keywords.
+    """
+
+    def __init__(self, alias_map: dict):
+        self.aliases = list(alias_map)
+        self.words = {}     # stem → aliases
+        self.phrases = {}   # first word → [(following words, last one stemmed), alias]
+        for alias, keywords in alias_map.items():
+            for kw in keywords:
+                words = tokenize(kw)
+                if len(words) == 1:
+                    self.words.setdefault(keyword_stem(words[0]), set()).add(alias)
+                elif words:
+                    rest = tuple(words[1:-1]) + (keyword_stem(words[-1]),)
+                    self.phrases.setdefault(words[0], []).append((rest, alias))
+        self.shortest = min(map(len, self.words), default=1)
+        self.seen = {}      # token → (aliases, phrases starting with it)
+
+    def lookup(self, token: str) -> tuple:
+        """(aliases of the keyword stems `token` starts with, phrases starting with `token`)."""
+        found = self.seen.get(token)
+        if found is None:
+            aliases = set()
+            for n in range(self.shortest, len(token) + 1):
+                aliases |= self.words.get(token[:n], set())
+            found = self.seen[token] = (aliases, self.phrases.get(token, []))
+        return found
+
+    def find_tokens(self, tokens: list) -> list:
+        """Aliases with at least one keyword in a token stream, in alias map order."""
+        hits = set()
+        starts = []
+        for i, token in enumerate(tokens):
+            aliases, phrases = self.lookup(token)
+            hits |= aliases
+            if phrases:
+                starts.append((i, phrases))
+        for i, phrases in starts:
+            for rest, alias in phrases:
+                following = tokens[i + 1:i + 1 + len(rest)]
+                if (alias not in hits and len(following) == len(rest)
+                        and following[:-1] == list(rest[:-1]) and following[-1].startswith(rest[-1])):
+                    hits.add(alias)
+        return [a for a in self.aliases if a in hits]
+
+    def find(self, text: str) -> list:
+        return self.find_tokens(tokenize(text))
@@ -0,0 +1,85 @@
+import io
+import csv
+from sqlalchemy import Table, Column, Integer, Float, MetaData, insert, text
+from .db import chunked
+from .models import Recommendation
+
+STAGING_TABLE = 'recommendations_staging'
+INSERT_BATCH = 5_000
+
+
+class RecommendationWriter:
+    """
+    Streams scored rows into an unindexed staging table and swaps them into
+    `recommendations` in one transaction, so readers never see an empty table.
+
+    PostgreSQL through psycopg2 loads the staging table with COPY
+    (cursor.copy_expert); other drivers (psycopg 3, asyncpg…) and backends
+    (SQLite) fall back to batched executemany INSERTs.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.staging = Table(
+            STAGING_TABLE, MetaData(),
+            Column('game_id', Integer, nullable=False),
+            Column('movie_id', Integer, nullable=False),
+            Column('score', Float),
+        )
+        # copy_expert is psycopg2's cursor API
+        self.use_copy = engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+        self.rows = 0
+
+    def open(self):
+        self.staging.drop(self.engine, checkfirst=True)
+        self.staging.create(self.engine)
+        return self
+
+    def write(self, game_ids, movie_ids, scores) -> int:
+        rows = [(int(g), int(m), float(s)) for g, m, s in zip(game_ids, movie_ids, scores)]
+        if not rows:
+            return 0
+        if self.use_copy:
+            self._copy(rows)
+        else:
+            with self.engine.begin() as conn:
+                for i in range(0, len(rows), INSERT_BATCH):
+                    conn.execute(insert(self.staging), [
+                        {'game_id': g, 'movie_id': m, 'score': s}
+                        for g, m, s in rows[i:i + INSERT_BATCH]
+                    ])
+        self.rows += len(rows)
+        return len(rows)
+
+    def _copy(self, rows):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY {STAGING_TABLE} (game_id, movie_id, score) FROM STDIN WITH (FORMAT csv)",
+                    buf
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def swap(self, session, replace_game_ids=None):
+        """
+        Move the staged rows into `recommendations` inside the session's transaction.
+        replace_game_ids=None replaces the whole table, otherwise only those games' rows.
+        The caller commits, so other writes (fingerprints) land atomically with it.
+        """
+        rec = Recommendation.__table__
+        if replace_game_ids is None:
+            session.execute(rec.delete())
+        else:
+            for chunk in chunked(int(g) for g in replace_game_ids):
+                session.execute(rec.delete().where(rec.c.game_id.in_(chunk)))
+        session.execute(text(
+            f"INSERT INTO {rec.name} (game_id, movie_id, score) "
+            f"SELECT game_id, movie_id, score FROM {STAGING_TABLE}"
+        ))
+        session.execute(text(f"DROP TABLE {STAGING_TABLE}"))
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from core.db import SessionLocal
+from core.models import Game, Movie
+from core.text import KeywordMatcher, TokenCache
+from scripts.build_alias_map import load_alias_keywords, match_rows
+
+
+def substring_aliases(text: str, alias_map: dict) -> list:
+    """The previous find_aliases: a `kw in text` scan per alias × keyword."""
+    txt = (text or '').lower()
+    hits = []
+    for alias, keywords in alias_map.items():
+        for kw in keywords:
+            if kw in txt:
+                hits.append(alias)
+                break
+    return hits
+
+
+def add_keywords(alias_map: dict, extra: int, seed: int = 0) -> dict:
+    """`alias_map` plus aliases with `extra` made-up keywords in total, to mimic a larger map."""
+    rng = random.Random(seed)
+    out = dict(alias_map)
+    for i in range(0, extra, 5):
+        out[f"extra{i}"] = [''.join(rng.choices('bcdfghjklmnpqrstvwxz', k=7)) for _ in range(5)]
+    return out
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def main(copies: int, workers: int = 1, extra_keywords: int = 0, out: str = None):
+    """
+    Time the substring scan against the keyword matcher over every description:
+    tokenizing inline, through an empty token cache (tokenized by `workers`
+    processes) and through the filled cache, as build_alias_map finds it after
+    build_text_vectors. Also counts where substring and matcher hits differ.
+    """
+    alias_map = add_keywords(load_alias_keywords(), extra_keywords)
+    session = SessionLocal()
+    rows = session.query(Game.id, Game.description).all() + session.query(Movie.id, Movie.overview).all()
+    session.close()
+    # numbered copies, so the token cache cannot serve a copy from its original
+    rows = list(enumerate(f"{text or ''} {n:03d}" for n in range(copies) for _, text in rows))
+    n_keywords = sum(len(kws) for kws in alias_map.values())
+    print(f"🔧 {len(rows)} descriptions, {len(alias_map)} aliases / {n_keywords} keywords")
+
+    matcher, timings, hits = KeywordMatcher(alias_map), {}, {}
+    with tempfile.TemporaryDirectory(prefix="cinesteam_alias_") as tmp:
+        cache = TokenCache(os.path.join(tmp, "tokens.sqlite"), workers)
+        runs = {
+            "substring":     lambda: {str(i): substring_aliases(text, alias_map) for i, text in rows},
+            "matcher":       lambda: {str(i): matcher.find(text) for i, text in rows},
+            f"cold cache x{workers}": lambda: match_rows(rows, matcher, cache),
+            "warm cache":    lambda: match_rows(rows, matcher, cache),
+        }
+        for name, run in runs.items():
+            hits[name], secs = timed(run)
+            timings[name] = {"seconds": secs}
+        cache.close()
+
+    base = timings["substring"]["seconds"]
+    for name, t in timings.items():
+        print(f"   {name:>14}  {t['seconds']:7.2f}s  {len(rows) / t['seconds']:9.0f} docs/s  "
+              f"x{base / t['seconds']:5.1f}")
+
+    # substring-only hits are mostly keywords inside other words ("war" in "software")
+    old, new = hits["substring"], hits["matcher"]
+    only_old = sum(len(set(old[k]) - set(new[k])) for k in old)
+    only_new = sum(len(set(new[k]) - set(old[k])) for k in old)
+    differ = sum(set(old[k]) != set(new[k]) for k in old)
+    same = all(h == new for h in hits.values() if h is not old)
+    print(f"   {differ} descriptions with different aliases: {only_old} substring-only hits, "
+          f"{only_new} matcher-only hits")
+    print("✅ cached runs identical to the inline matcher" if same else
+          "❌ cached runs differ from the inline matcher")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump({"copies": copies, "descriptions": len(rows), "keywords": n_keywords,
+                       "timings": timings, "differ": differ, "substring_only": only_old,
+                       "matcher_only": only_new}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Substring scan vs compiled alias keyword matcher")
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="repeat the descriptions this many times")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes tokenizing for the cold-cache run")
+    parser.add_argument("--extra_keywords", type=int, default=0,
+                        help="add this many made-up keywords to the alias map")
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+    main(args.replicate, args.workers, args.extra_keywords, args.out)
@@ -0,0 +1,110 @@
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from scipy import sparse
+from core.scoring import DEFAULT_BLOCK_SIZE, load_matrices, score_range
+from core.candidates import CandidateIndex, PRUNED_BLOCK_SIZE, score_range_pruned
+
+
+def replicate_movies(mats: dict, copies: int, seed: int = 0) -> dict:
+    """
+    Tile the movie side `copies` times to mimic a larger catalog. Copies get
+    their genre/text weights jittered so they are not exact ties of the original.
+    """
+    if copies <= 1:
+        return mats
+    rng = np.random.default_rng(seed)
+    out = dict(mats)
+    for name in ('M_genre_T', 'M_text_T', 'M_alias_T'):
+        parts = [mats[name]]
+        for _ in range(copies - 1):
+            X = mats[name].copy()
+            if name != 'M_alias_T':
+                X.data = X.data * rng.uniform(0.5, 1.5, size=X.nnz)
+            parts.append(X)
+        out[name] = sparse.hstack(parts).tocsr()
+    return out
+
+
+def top_scores(blocks) -> list:
+    """Per game: its positive top-k scores."""
+    out = []
+    for _, _, _, top_val in blocks:
+        out.extend(val[val > 0] for val in top_val)
+    return out
+
+
+def recall(truth: list, got: list, eps: float = 1e-9) -> float:
+    """
+    Share of the exact top-k recovered. Compared by score rather than movie id,
+    so ties (and replicated movies) count as hits.
+    """
+    hits = total = 0
+    for t, g in zip(truth, got):
+        if len(t):
+            hits += min(len(t), int((g >= t.min() - eps).sum()))
+            total += len(t)
+    return hits / total if total else 1.0
+
+
+def main(sample: int, copies: int, top_k: int, alpha: float, beta: float,
+         top_terms_grid, candidates_grid, max_df_grid, block_size: int, out: str = None):
+    mats, game_ids, movie_ids = load_matrices()
+    mats = replicate_movies(mats, copies)
+    n = min(sample, len(game_ids))
+    n_movies = mats['M_genre_T'].shape[1]
+    print(f"🔧 {n} games × {n_movies} movies, top_k={top_k}")
+
+    t = time.perf_counter()
+    truth = top_scores(score_range(mats, 0, n, alpha, beta, top_k, block_size))
+    brute_s = time.perf_counter() - t
+    print(f"{'brute force':>32}  {brute_s:8.3f}s")
+
+    results = [{'mode': 'brute', 'seconds': brute_s, 'recall': 1.0}]
+    for top_terms, max_df in itertools.product(top_terms_grid, max_df_grid):
+        t = time.perf_counter()
+        index = CandidateIndex(mats, alpha, beta, top_terms, max_df)
+        build_s = time.perf_counter() - t
+        for candidates in candidates_grid:
+            t = time.perf_counter()
+            got = top_scores(score_range_pruned(mats, index, 0, n, top_k,
+                                                PRUNED_BLOCK_SIZE, candidates))
+            secs = time.perf_counter() - t
+            r = recall(truth, got)
+            label = f'terms={top_terms} df={max_df:g} cand={candidates}'
+            print(f"{label:>32}  {secs:8.3f}s  x{brute_s / secs:5.1f}  "
+                  f"recall@{top_k}={r:.3f}  (index {build_s:.2f}s)")
+            results.append({'mode': 'pruned', 'top_terms': top_terms, 'max_df': max_df,
+                            'candidates': candidates, 'seconds': secs,
+                            'index_s': build_s, 'recall': r})
+
+    if out:
+        with open(out, 'w') as f:
+            json.dump({'games': n, 'movies': n_movies, 'top_k': top_k, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Candidate pruning vs brute-force scoring')
+    parser.add_argument('--sample', type=int, default=2000, help='games to score')
+    parser.add_argument('--replicate', type=int, default=1,
+                        help='tile the movie catalog this many times')
+    parser.add_argument('--top_k', type=int, default=10)
+    parser.add_argument('--alpha', type=float, default=0.5)
+    parser.add_argument('--beta', type=float, default=0.1)
+    parser.add_argument('--top_terms', default='10,20,50',
+                        help='comma-separated TF-IDF terms per title')
+    parser.add_argument('--candidates', default='100,200,500',
+                        help='comma-separated max candidates per game')
+    parser.add_argument('--max_df', default='0.2,0.5,1.0',
+                        help='comma-separated posting document-frequency cutoffs')
+    parser.add_argument('--block_size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='block size of the brute-force path')
+    parser.add_argument('--out', default=None, help='write results as JSON')
+    args = parser.parse_args()
+    main(args.sample, args.replicate, args.top_k, args.alpha, args.beta,
+         [int(v) for v in args.top_terms.split(',')],
+         [int(v) for v in args.candidates.split(',')],
+         [float(v) for v in args.max_df.split(',')],
+         args.block_size, args.out)
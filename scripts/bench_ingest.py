@@ -0,0 +1,93 @@
+import os
+import csv
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+import scripts.load_data as ld
+
+
+def replicate_csv(fn: str, copies: int, directory: str) -> str:
+    """Write `fn` with its data rows repeated `copies` times, to mimic a larger export."""
+    out = os.path.join(directory, fn)
+    with open(os.path.join(ld.DATA_DIR, fn), newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(rows[0])
+        for _ in range(copies):
+            w.writerows(rows[1:])
+    return out
+
+
+def comparable(batches):
+    """Flatten record batches, with errors as strings so both paths compare equal."""
+    out = []
+    for batch in batches:
+        for rec in batch:
+            rec = dict(rec)
+            if "error" in rec:
+                rec["error"] = str(rec["error"])
+            if "dims" in rec:
+                rec["dims"] = {m.__name__: v for m, v in rec["dims"].items()}
+            out.append(rec)
+    return out
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def main(copies: int, workers: int = 1, out: str = None):
+    """
+    Parse-only comparison of the row-by-row and columnar readers (no DB writes),
+    optionally also through a pool of `workers` parsing processes.
+    """
+    results = {}
+    pool = mp.Pool(workers) if workers > 1 else None
+    with tempfile.TemporaryDirectory(prefix="cinesteam_ingest_") as tmp:
+        if copies > 1:
+            for fn in ("steam_games.csv", "imdb_top_1000.csv"):
+                replicate_csv(fn, copies, tmp)
+            ld.DATA_DIR = tmp
+
+        for fn, kind in (("steam_games.csv", "games"), ("imdb_top_1000.csv", "movies")):
+            runs = {
+                "row-by-row": lambda: ld.read_batches(fn, kind),
+                "columnar":   lambda: ld.read_batches(fn, kind, True),
+            }
+            if pool is not None:
+                runs[f"row-by-row x{workers}"] = lambda: ld.parallel_batches(pool, fn, kind, workers)
+                runs[f"columnar x{workers}"] = lambda: ld.parallel_batches(pool, fn, kind, workers, True)
+
+            timings, ref = {}, None
+            for name, run in runs.items():
+                recs, secs = timed(lambda: comparable(run()))
+                ref = recs if ref is None else ref
+                timings[name] = {"seconds": secs, "identical": recs == ref}
+            base = timings["row-by-row"]["seconds"]
+            print(f"{fn} ({len(ref)} rows)")
+            for name, t in timings.items():
+                print(f"   {name:>18}  {t['seconds']:7.2f}s  {len(ref) / t['seconds']:8.0f} rows/s  "
+                      f"x{base / t['seconds']:5.1f}  {'✅' if t['identical'] else '❌ records differ'}")
+            results[fn] = {"rows": len(ref), "timings": timings}
+    if pool is not None:
+        pool.close()
+
+    if out:
+        with open(out, "w") as f:
+            json.dump({"copies": copies, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row-by-row vs columnar CSV parsing")
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="repeat the data rows this many times")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="also time the parallel readers with this many processes")
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+    main(args.replicate, args.workers, args.out)
@@ -1,12 +1,17 @@
 import os
 import json
-from core.db import SessionLocal
+import argparse
+import numpy as np
+from scipy import sparse
+from core.db import SessionLocal, use_profile
+from core.features import FEATURE_DTYPE, FeatureStore
+from core.instrument import instrumented, stage
 from core.models import Game, Movie
+from core.text import KeywordMatcher, TokenCache
 
 # Paths
 data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
 alias_keywords_path = os.path.join(data_dir, 'alias_keywords.json')
-alias_map_path      = os.path.join(data_dir, 'alias_map.json')
 
 
 def load_alias_keywords():
@@ -14,40 +19,66 @@ def load_alias_keywords():
         return json.load(f)
 
 
-def find_aliases(text: str, alias_map: dict) -> list:
-    txt = (text or '').lower()
-    hits = []
-    for alias, keywords in alias_map.items():
-        for kw in keywords:
-            if kw in txt:
-                hits.append(alias)
-                break
-    return hits
+def match_rows(rows, matcher: KeywordMatcher, cache: TokenCache) -> dict:
+    """
+    {str(id): [alias, …]} for (id, text) rows. Token streams come from the
+    cache (filled by build_text_vectors); missing ones are tokenized by its pool.
+    """
+    tokens = cache.tokens([text for _, text in rows])
+    return {str(i): matcher.find_tokens(toks) for (i, _), toks in zip(rows, tokens)}
 
 
-def main():
+def incidence_matrix(hits_by_id: dict, ids: list, alias_index: dict):
+    """CSR matrix with one row per id (in `ids` order) and a 1 per matched alias."""
+    rows, cols = [], []
+    for r, i in enumerate(ids):
+        for alias in hits_by_id[str(i)]:
+            rows.append(r)
+            cols.append(alias_index[alias])
+    data = np.ones(len(rows), dtype=FEATURE_DTYPE)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(ids), len(alias_index)))
+
+
+def main(workers: int = 1):
     alias_keywords = load_alias_keywords()
+    matcher = KeywordMatcher(alias_keywords)
+    use_profile("bulk")
     session = SessionLocal()
+    cache = TokenCache(workers=workers)
+    try:
+        st = stage("match games")
+        game_aliases = match_rows(session.query(Game.id, Game.description).order_by(Game.id).all(),
+                                  matcher, cache)
+        st["rows"] = len(game_aliases)
 
-    game_aliases = {}
-    for game in session.query(Game).all():
-        game_aliases[str(game.id)] = find_aliases(game.description, alias_keywords)
-
-    movie_aliases = {}
-    for movie in session.query(Movie).all():
-        movie_aliases[str(movie.id)] = find_aliases(movie.overview, alias_keywords)
+        st = stage("match movies")
+        movie_aliases = match_rows(session.query(Movie.id, Movie.overview).order_by(Movie.id).all(),
+                                   matcher, cache)
+        st["rows"] = len(movie_aliases)
+        st["cache_hits"] = cache.hits
+    finally:
+        cache.close()
+        session.close()
 
-    session.close()
+    stage("feature store")
+    # incidence matrices, one column per alias
+    aliases     = list(alias_keywords.keys())
+    alias_index = {a: i for i, a in enumerate(aliases)}
+    game_ids    = [int(k) for k in game_aliases]
+    movie_ids   = [int(k) for k in movie_aliases]
 
-    with open(alias_map_path, 'w', encoding='utf-8') as f:
-        json.dump({
-            'aliases': list(alias_keywords.keys()),
-            'game_aliases': game_aliases,
-            'movie_aliases': movie_aliases
-        }, f, indent=2)
+    store = FeatureStore()
+    store.put('game',  'alias', incidence_matrix(game_aliases,  game_ids,  alias_index),
+              game_ids, meta={'aliases': aliases})
+    store.put('movie', 'alias', incidence_matrix(movie_aliases, movie_ids, alias_index), movie_ids)
 
-    print(f"✅ Alias map written to {alias_map_path}")
+    print(f"✅ Alias features written to {store.path}")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes tokenizing descriptions missing from the token cache')
+    args = parser.parse_args()
+    with instrumented("build_alias_map"):
+        main(args.workers)
@@ -1,21 +1,33 @@
-import json
-import os
 import math
+import argparse
 from collections import defaultdict
-from core.db import SessionLocal
+from scipy import sparse
+from core.db import SessionLocal, use_profile
+from core.features import FEATURE_DTYPE, FeatureStore
+from core.instrument import instrumented, stage
 from core.models import Game, Movie, Genre
 from sqlalchemy.orm import joinedload
 
-# where to dump vectors
-VEC_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "genre_vectors.json")
 
-def build_vectors():
+def build_vectors(incremental: bool = False):
+    """
+    Encode every game's and movie's genres as IDF-weighted rows, with the genre
+    index and IDF fitted on the current catalog. `incremental` keeps the index
+    and weights of the previous build instead (as build_text_vectors
+    --incremental keeps its vectorizer), so only the rows whose genres changed
+    differ and incremental scoring keeps its fingerprints; genres not seen
+    before are appended with weights from the current counts.
+    """
+    use_profile("bulk")
     session = SessionLocal()
+    store = FeatureStore()
+    frozen = store.meta("genre") if incremental else {}
     try:
         # 1) Load all canonical genres
+        st = stage("load")
         genres = session.query(Genre).all()
-        # build a 0-based index only over unique lower-cased names
-        genre_index = {}
+        # build a 0-based index only over unique lower-cased names, after the frozen ones
+        genre_index = dict(frozen.get("genre_index", {}))
         for g in genres:
             key = g.name.strip().lower()
             if key not in genre_index:
@@ -25,7 +37,10 @@ def build_vectors():
         games = session.query(Game).options(joinedload(Game.genres)).all()
         movies = session.query(Movie).options(joinedload(Movie.genres)).all()
 
+        st["rows"] = len(games) + len(movies)
+
         # 3) Document frequency for each genre
+        stage("encode", rows=len(games) + len(movies))
         df = defaultdict(int)
         for obj in games + movies:
             seen = set()
@@ -35,39 +50,44 @@ def build_vectors():
                     df[name] += 1
                     seen.add(name)
 
-        # 4) Compute IDF weights
-        idf = {name: 1.0 / math.log(1 + count) for name, count in df.items()}
-
-        # helper: build TF-IDF vector
-        def encode(obj):
-            vec = [0.0] * len(genre_index)
-            for g in obj.genres:
-                name = g.name.strip().lower()
-                idx = genre_index.get(name)
-                if idx is not None:
-                    vec[idx] = idf.get(name, 0.0)
-            if all(v == 0.0 for v in vec):
-                # skip if truly genreless
-                return None
-            return vec
+        # 4) Compute IDF weights for genres without a frozen one
+        idf = dict(frozen.get("idf", {}))
+        added = [name for name in df if name not in idf]
+        idf.update({name: 1.0 / math.log(1 + df[name]) for name in added})
+        if frozen:
+            print(f"♻️  Reusing the genre IDF of the previous build ({len(added)} genres added)")
 
-        # 5) Build and filter out None
-        game_vectors = {g.id: encode(g) for g in games}
-        game_vectors = {gid: vec for gid, vec in game_vectors.items() if vec is not None}
+        # helper: build a sparse TF-IDF matrix, skipping truly genreless rows
+        def encode(objs):
+            ids, indptr, indices, data = [], [0], [], []
+            for obj in objs:
+                row = {}
+                for g in obj.genres:
+                    name = g.name.strip().lower()
+                    idx = genre_index.get(name)
+                    if idx is not None and idf.get(name, 0.0):
+                        row[idx] = idf[name]
+                if not row:
+                    continue
+                ids.append(obj.id)
+                indices.extend(row.keys())
+                data.extend(row.values())
+                indptr.append(len(indices))
+            X = sparse.csr_matrix((data, indices, indptr), shape=(len(ids), len(genre_index)),
+                                  dtype=FEATURE_DTYPE)
+            X.sort_indices()
+            return X, ids
 
-        movie_vectors = {m.id: encode(m) for m in movies}
-        movie_vectors = {mid: vec for mid, vec in movie_vectors.items() if vec is not None}
+        # 5) Build and write to the feature store
+        G, game_ids = encode(games)
+        M, movie_ids = encode(movies)
 
-        # 6) Write out
-        with open(VEC_PATH, "w") as f:
-            json.dump({
-                "genre_index": genre_index,
-                "game_vectors": game_vectors,
-                "movie_vectors": movie_vectors,
-                "idf": idf
-            }, f)
+        stage("feature store")
+        meta = {"genre_index": genre_index, "idf": idf}
+        store.put("game", "genre", G, game_ids, meta=meta)
+        store.put("movie", "genre", M, movie_ids)
 
-        print(f"✅ Genre vectors saved to {VEC_PATH}")
+        print(f"✅ Genre vectors saved to {store.path}")
     except Exception as e:
         session.rollback()
         print(f"❌ Error building genre vectors: {e}")
@@ -76,4 +96,10 @@ def build_vectors():
         session.close()
 
 if __name__ == "__main__":
-    build_vectors()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the stored genre index and IDF instead of refitting them, "
+                             "so score_recommendations --incremental only rescores changed games")
+    args = parser.parse_args()
+    with instrumented("build_genre_vectors"):
+        build_vectors(args.incremental)
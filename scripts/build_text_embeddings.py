@@ -0,0 +1,161 @@
+import os
+import glob
+import time
+import argparse
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from core.features import FEATURE_DTYPE, FeatureStore
+from core.instrument import instrumented, stage
+from core.scoring import DEFAULT_BLOCK_SIZE, TEXT_FEATURES, load_matrices, score_range
+
+DEFAULT_DIMS = 256
+# fitted projection (TF-IDF row → embedding), versioned like the text vectorizer
+SVD_FILE = "text_svd.v{version}.joblib"
+AGREEMENT_SAMPLE = 2000   # games whose sparse and LSA top-k are compared
+
+
+def save_svd(store, projection: dict, version: int) -> str:
+    """Persist the projection fitted on text features `version`, dropping older ones."""
+    fn = SVD_FILE.format(version=version)
+    joblib.dump(projection, os.path.join(store.path, fn))
+    for old in glob.glob(os.path.join(store.path, SVD_FILE.format(version="*"))):
+        if os.path.basename(old) != fn:
+            os.remove(old)
+    return fn
+
+
+def load_svd(store):
+    """The persisted projection ({"columns", "svd"}) of the stored LSA embedding, or None."""
+    fn = store.meta(TEXT_FEATURES["lsa"]).get("artifact")
+    if not fn or not os.path.exists(os.path.join(store.path, fn)):
+        return None
+    return joblib.load(os.path.join(store.path, fn))
+
+
+def project(projection: dict, X):
+    """LSA embedding of TF-IDF rows X, as FEATURE_DTYPE."""
+    return projection["svd"].transform(X[:, projection["columns"]]).astype(FEATURE_DTYPE)
+
+
+def fit_svd(X, dims: int) -> dict:
+    """
+    Truncated SVD of X restricted to its non-empty columns: hashed features
+    have millions of columns, and the randomized solver allocates a dense
+    block per column.
+    """
+    columns = np.unique(X.indices)
+    svd = TruncatedSVD(n_components=min(dims, len(columns) - 1),
+                       algorithm="randomized", random_state=0)
+    svd.fit(X[:, columns])
+    return {"columns": columns, "svd": svd}
+
+
+def artifact_mb(store, side: str, name: str) -> float:
+    files = glob.glob(os.path.join(store.path, f"{side}.{name}.*npy"))
+    return sum(os.path.getsize(f) for f in files) / 2**20
+
+
+def ranking_agreement(store, sample: int, alpha: float, beta: float, top_k: int,
+                      block_size: int = DEFAULT_BLOCK_SIZE) -> dict:
+    """
+    How closely LSA scoring reproduces the sparse TF-IDF top-k on the first
+    `sample` games, for text similarity alone and for the combined score.
+    `overlap` is the mean share of a game's sparse top-k (positive scores)
+    also in its LSA top-k; `top1` the share of games with the same best movie.
+    """
+    ref_mats, game_ids, _ = load_matrices(store)
+    lsa_mats, _, _ = load_matrices(store, text="lsa")
+    n = min(sample, len(game_ids))
+    out = {"sample": n, "top_k": top_k}
+    for label, a, b in (("text", 0.0, 0.0), ("combined", alpha, beta)):
+        overlap, top1, rows = 0.0, 0, 0
+        ref = score_range(ref_mats, 0, n, a, b, top_k, block_size)
+        got = score_range(lsa_mats, 0, n, a, b, top_k, block_size)
+        for (_, _, r_idx, r_val), (_, _, g_idx, _) in zip(ref, got):
+            for i in range(len(r_idx)):
+                expected = r_idx[i][r_val[i] > 0]
+                if not len(expected):
+                    continue  # no text / nothing in common: any order is a tie
+                overlap += len(np.intersect1d(expected, g_idx[i])) / len(expected)
+                top1 += expected[0] == g_idx[i][0]
+                rows += 1
+        out[label] = {"games": rows, "overlap": overlap / max(rows, 1), "top1": top1 / max(rows, 1)}
+    return out
+
+
+def build_embeddings(dims: int = DEFAULT_DIMS, refit: bool = False, sample: int = AGREEMENT_SAMPLE,
+                     alpha: float = 0.5, beta: float = 0.1, top_k: int = 10):
+    """
+    Project the game and movie TF-IDF rows into a `dims`-dimensional LSA space
+    (truncated SVD) and store them as dense 'text_lsa' features. The SVD is
+    refitted only when the text features were refitted since (new vocabulary);
+    rows added incrementally are projected with the persisted one.
+    """
+    store = FeatureStore()
+    name = TEXT_FEATURES["lsa"]
+    text_meta = store.meta("text")
+
+    st = stage("load")
+    G = store.get("game", "text")
+    M = store.get("movie", "text")
+    st["rows"] = G.shape[0] + M.shape[0]
+
+    projection = None if refit else load_svd(store)
+    if projection is not None and (store.meta(name).get("text_version") != text_meta.get("version")
+                                   or projection["svd"].n_components != dims):
+        projection = None
+    if projection is None:
+        stage("fit", rows=G.shape[0] + M.shape[0])
+        projection = fit_svd(sparse.vstack([G, M]).tocsr(), dims)
+        print(f"🔧 Fitted a {projection['svd'].n_components}-dim SVD, explained variance "
+              f"{projection['svd'].explained_variance_ratio_.sum():.1%}")
+    else:
+        print(f"♻️  Reusing the persisted {projection['svd'].n_components}-dim SVD")
+    svd = projection["svd"]
+
+    stage("project", rows=G.shape[0] + M.shape[0])
+    meta = {
+        "dims": int(svd.n_components),
+        "explained_variance": float(svd.explained_variance_ratio_.sum()),
+        "text_version": text_meta.get("version"),
+        "text_updated_at": text_meta.get("updated_at"),
+        "artifact": save_svd(store, projection, text_meta.get("version", 0)),
+        "updated_at": time.time(),
+    }
+    store.put("game", name, project(projection, G), store.ids("game"))
+    store.put("movie", name, project(projection, M), store.ids("movie"), meta=meta)
+
+    sizes = {feature: sum(artifact_mb(store, side, feature) for side in ("game", "movie"))
+             for feature in ("text", name)}
+    print(f"✅ LSA text embedding saved to {store.path} "
+          f"({sizes['text']:.1f} MiB sparse → {sizes[name]:.1f} MiB dense)")
+
+    st = stage("agreement")
+    agreement = ranking_agreement(store, sample, alpha, beta, top_k)
+    st["rows"] = agreement["sample"]
+    store.set_meta(name, {**meta, "sizes_mb": sizes, "agreement": agreement})
+    print(f"📏 Top-{top_k} agreement with the sparse path on {agreement['sample']} games:")
+    for label in ("text", "combined"):
+        a = agreement[label]
+        print(f"   {label:<9} overlap {a['overlap']:.1%}, same top-1 {a['top1']:.1%} "
+              f"({a['games']} games)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dense LSA embedding of the TF-IDF text vectors")
+    parser.add_argument("--dims", type=int, default=DEFAULT_DIMS,
+                        help="embedding dimensions (SVD components)")
+    parser.add_argument("--refit", action="store_true",
+                        help="fit a new SVD even if the persisted one matches the text features")
+    parser.add_argument("--sample", type=int, default=AGREEMENT_SAMPLE,
+                        help="games used for the ranking-agreement report")
+    parser.add_argument("--alpha", type=float, default=0.5,
+                        help="genre weight of the combined score in the report")
+    parser.add_argument("--beta", type=float, default=0.1,
+                        help="alias weight of the combined score in the report")
+    parser.add_argument("--top_k", type=int, default=10)
+    args = parser.parse_args()
+    with instrumented("build_text_embeddings"):
+        build_embeddings(args.dims, args.refit, args.sample, args.alpha, args.beta, args.top_k)
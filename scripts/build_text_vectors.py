@@ -1,52 +1,304 @@
 import os
 import json
+import glob
+import time
+import random
+import argparse
+import tempfile
+import joblib
+import numpy as np
+from contextlib import contextmanager
 from tqdm import tqdm
-from scipy import sparse
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from core.db import SessionLocal
+from sqlalchemy import select
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import normalize
+from core.db import SessionLocal, chunked, use_profile
+from core.features import FEATURE_DTYPE, FeatureStore, load_csr, save_csr
+from core.ingest import ChangeLog
+from core.instrument import instrumented, stage
 from core.models import Game, Movie
+from core.text import TokenCache, content_tokens, drop_stop_words, identity
+from scripts.load_data import CHANGES_FILE
 
 load_dotenv()
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def main():
-    session = SessionLocal()
+HASH_FEATURES = 2**22   # hashed 1–2 gram columns; fewer collisions cost only a larger indptr
+STREAM_BATCH = 2000     # descriptions fetched and hashed per chunk
+TEXT_SOURCES = (("game", Game, Game.description), ("movie", Movie, Movie.overview))
+
+# fitted text transform, kept next to the features it produced
+VECTORIZER_FILE = "text_vectorizer.v{version}.joblib"
+# out-of-vocabulary token share (above the fit-time baseline) that forces a refit
+DRIFT_THRESHOLD = 0.2
+OOV_SAMPLE = 2000       # fit texts sampled for the baseline OOV share
+# watermark name in the load_data ChangeLog
+CONSUMER = "build_text_vectors"
+
+
+def save_vectorizer(store, vectorizer, meta: dict) -> dict:
+    """
+    Persist the transform that produced the stored text features as the next
+    version, dropping superseded ones. Returns `meta` plus version and file name,
+    for store.set_meta("text", …).
+    """
+    version = store.meta("text").get("version", 0) + 1
+    fn = VECTORIZER_FILE.format(version=version)
+    joblib.dump(vectorizer, os.path.join(store.path, fn))
+    for old in glob.glob(os.path.join(store.path, VECTORIZER_FILE.format(version="*"))):
+        if os.path.basename(old) != fn:
+            os.remove(old)
+    return {**meta, "version": version, "artifact": fn}
+
+
+def load_vectorizer(store):
+    """The persisted transform (texts → text feature rows) of the stored features, or None."""
+    fn = store.meta("text").get("artifact")
+    if not fn or not os.path.exists(os.path.join(store.path, fn)):
+        return None
+    return joblib.load(os.path.join(store.path, fn))
+
+
+@contextmanager
+def pretokenized(vectorizer):
+    """
+    Let `vectorizer` take token lists (e.g. from a TokenCache) instead of raw texts.
+    Stop words are dropped by the tokenizer rather than through `stop_words`,
+    which sklearn would check by re-tokenizing the stop word list (and warn).
+    """
+    params = vectorizer.get_params()
+    vectorizer.set_params(preprocessor=identity, tokenizer=drop_stop_words, stop_words=None)
+    try:
+        yield vectorizer
+    finally:
+        vectorizer.set_params(preprocessor=params["preprocessor"], tokenizer=params["tokenizer"],
+                              stop_words=params["stop_words"])
+
+
+def oov_counts(vectorizer, texts):
+    """(terms, terms outside the fitted vocabulary) over `texts`, as the vectorizer analyzes them."""
+    analyze, vocab = vectorizer.build_analyzer(), vectorizer.vocabulary_
+    terms = oov = 0
+    for text in texts:
+        found = analyze(text)
+        terms += len(found)
+        oov += sum(term not in vocab for term in found)
+    return terms, oov
+
+
+def build_tfidf(session, store, cache):
+    """Fit one TfidfVectorizer (50k-term vocabulary) over every description in memory."""
+    st = stage("load")
     games  = session.query(Game).filter(Game.description.isnot(None)).all()
     movies = session.query(Movie).filter(Movie.overview.isnot(None)).all()
 
     game_texts  = [g.description for g in games]
     movie_texts = [m.overview    for m in movies]
+    st["rows"] = len(games) + len(movies)
 
     vectorizer = TfidfVectorizer(
         max_features=50_000,
-        stop_words="english",
-        ngram_range=(1,2)
+        ngram_range=(1,2),
+        tokenizer=content_tokens, lowercase=False, token_pattern=None,
+        dtype=FEATURE_DTYPE
     )
     all_texts = game_texts + movie_texts
-    X = vectorizer.fit_transform(tqdm(all_texts, desc="TF-IDF"))
+    st = stage("tokenize", rows=len(all_texts))
+    all_tokens = cache.tokens(all_texts)
+    st["cache_hits"] = cache.hits
+    stage("tfidf", rows=len(all_texts))
+    with pretokenized(vectorizer):
+        X = vectorizer.fit_transform(tqdm(all_tokens, desc="TF-IDF"))
 
     G = X[: len(games)]
     M = X[len(games):]
 
-    # save sparse matrices
-    sparse.save_npz(os.path.join(DATA_DIR, "game_text.npz"), G)
-    sparse.save_npz(os.path.join(DATA_DIR, "movie_text.npz"), M)
+    # save sparse matrices, rows keyed by entity id
+    stage("feature store")
+    store.put("game",  "text", G, [g.id for g in games])
+    store.put("movie", "text", M, [m.id for m in movies])
 
-    # cast everything to built-in ints for JSON
+    # the fit corpus's own OOV share (terms cut by max_features) is the drift baseline
+    sample = random.Random(0).sample(all_tokens, min(OOV_SAMPLE, len(all_tokens)))
+    with pretokenized(vectorizer):
+        terms, oov = oov_counts(vectorizer, sample)
+    store.set_meta("text", save_vectorizer(store, vectorizer, {
+        "vectorizer": "tfidf", "fitted_docs": len(all_texts), "updated_at": time.time(),
+        "baseline_oov": oov / max(terms, 1),
+        "since_fit": {"docs": 0, "terms": 0, "oov": 0},
+    }))
+
+    # vocabulary isn't needed for scoring, so it stays out of the store manifest
     vocab = { term: int(idx)
               for term, idx in vectorizer.vocabulary_.items() }
-    meta = {
-        "vocabulary": vocab,
-        "game_ids":   [int(g.id) for g in games],
-        "movie_ids":  [int(m.id) for m in movies]
-    }
     with open(os.path.join(DATA_DIR, "text_meta.json"), "w") as f:
-        json.dump(meta, f)
+        json.dump({"vocabulary": vocab}, f)
+
+
+def hashing_vectorizer():
+    """Stateless counterpart of the TF-IDF vectorizer's tokenization; yields raw counts."""
+    return HashingVectorizer(n_features=HASH_FEATURES, ngram_range=(1, 2),
+                             tokenizer=content_tokens, lowercase=False, token_pattern=None,
+                             alternate_sign=False, norm=None, dtype=FEATURE_DTYPE)
+
 
-    print("✅ Text vectors built and saved.")
-    session.close()
+def hash_counts(session, side, model, column, vectorizer, cache, tmp_dir, df):
+    """
+    Pass 1 for one side: stream (id, text) in id order through a server-side
+    cursor, spill each chunk's term counts to tmp_dir and add its document
+    frequencies to `df`. Returns (ids, total nnz, number of chunks).
+    """
+    stmt = (select(model.id, column).where(column.isnot(None)).order_by(model.id)
+            .execution_options(yield_per=STREAM_BATCH))
+    ids, nnz, n_chunks = [], 0, 0
+    with tqdm(desc=f"Hashing {side}s") as bar:
+        for rows in session.execute(stmt).partitions():
+            with pretokenized(vectorizer):
+                X = vectorizer.transform(cache.tokens([text for _, text in rows]))
+            X.sort_indices()
+            save_csr(tmp_dir, f"{side}.{n_chunks}", X)
+            df += np.bincount(X.indices, minlength=HASH_FEATURES)
+            ids.extend(i for i, _ in rows)
+            nnz += X.nnz
+            n_chunks += 1
+            bar.update(len(rows))
+    return ids, nnz, n_chunks
+
+
+def tfidf_chunks(tmp_dir, side, n_chunks, idf):
+    """Pass 2: the spilled count chunks weighted by idf and L2-normalized, like TfidfVectorizer."""
+    for i in range(n_chunks):
+        X = load_csr(tmp_dir, f"{side}.{i}", mmap_mode=None)
+        X.data *= idf[X.indices]
+        yield normalize(X, copy=False)
+
+
+def build_hashed(session, store, cache):
+    """
+    Out-of-core TF-IDF: hashed 1–2 gram counts, an IDF accumulated over all
+    chunks of both sides, and each side's matrix written chunk by chunk.
+    Memory stays flat as the catalog grows, and there is no vocabulary to save.
+    """
+    vectorizer = hashing_vectorizer()
+    df = np.zeros(HASH_FEATURES, dtype=np.int64)
+    with tempfile.TemporaryDirectory(prefix="cinesteam_text_") as tmp_dir:
+        st = stage("hash")
+        counts = {side: hash_counts(session, side, model, column, vectorizer, cache, tmp_dir, df)
+                  for side, model, column in TEXT_SOURCES}
+        n_docs = sum(len(ids) for ids, _, _ in counts.values())
+        st["rows"] = n_docs
+        # smooth idf, as TfidfVectorizer computes it
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(FEATURE_DTYPE)
+
+        stage("feature store", rows=n_docs)
+        for side, (ids, nnz, n_chunks) in counts.items():
+            store.put_chunks(side, "text", ids, tfidf_chunks(tmp_dir, side, n_chunks, idf),
+                             HASH_FEATURES, nnz)
+
+    # the same transform for single texts at query time: hash, then the accumulated idf
+    weights = TfidfTransformer()
+    weights.idf_ = idf
+    store.set_meta("text", save_vectorizer(store, make_pipeline(vectorizer, weights), {
+        "vectorizer": "hashing", "n_features": HASH_FEATURES, "fitted_docs": n_docs,
+        "updated_at": time.time(),
+    }))
+
+
+def pending_texts(session, store, side, model, column, changes):
+    """
+    (ids, texts) whose text row must be rebuilt: changed by a load_data run
+    this builder has not acknowledged in the ChangeLog `changes`, or with text
+    but never built (texts with no terms keep an empty row, which counts as
+    built). Texts that became NULL come back empty.
+    """
+    built = set(store.built_ids(side, "text").tolist())
+    with_text = {i for (i,) in session.query(model.id).filter(column.isnot(None))}
+    ids = sorted(changes.pending(CONSUMER, f"{side}s") | (with_text - built))
+    texts = {}
+    for chunk in chunked(ids):
+        texts.update(session.query(model.id, column).filter(model.id.in_(chunk)))
+    ids = [i for i in ids if i in texts]
+    return ids, [texts[i] or "" for i in ids]
+
+
+def build_incremental(session, store, cache, changes, threshold: float = DRIFT_THRESHOLD):
+    """
+    Transform only new/changed texts with the persisted TF-IDF vectorizer and
+    replace their rows. Refits from scratch when there is no vectorizer yet, or
+    when the share of out-of-vocabulary terms among the texts transformed since
+    the last fit exceeds the fit's own baseline by more than `threshold`.
+    """
+    meta = store.meta("text")
+    vectorizer = load_vectorizer(store) if meta.get("vectorizer") == "tfidf" else None
+    if vectorizer is None:
+        print("⚠️  No persisted TF-IDF vectorizer, fitting from scratch")
+        return build_tfidf(session, store, cache)
+
+    st = stage("load")
+    pending = {side: pending_texts(session, store, side, model, column, changes)
+               for side, model, column in TEXT_SOURCES}
+    texts = [t for _, side_texts in pending.values() for t in side_texts]
+    st["rows"] = len(texts)
+
+    stage("drift", rows=len(texts))
+    terms, oov = oov_counts(vectorizer, texts)
+    since = meta["since_fit"]
+    since = {"docs": since["docs"] + len(texts), "terms": since["terms"] + terms,
+             "oov": since["oov"] + oov}
+    drift = since["oov"] / max(since["terms"], 1) - meta["baseline_oov"]
+    print(f"🔎 {len(texts)} new/changed texts, vocabulary drift {drift:.3f} "
+          f"(threshold {threshold:.3f}, {since['docs']} texts since the last fit)")
+    if drift > threshold:
+        print("🔁 Drift over threshold, refitting")
+        return build_tfidf(session, store, cache)
+
+    stage("transform", rows=len(texts))
+    for side, (ids, side_texts) in pending.items():
+        if ids:
+            store.put_rows(side, "text", vectorizer.transform(side_texts), ids)
+    store.set_meta("text", {**meta, "since_fit": since, "drift": drift, "updated_at": time.time()})
+
+
+def main(hashing: bool = False, incremental: bool = False,
+         drift_threshold: float = DRIFT_THRESHOLD, workers: int = 1):
+    use_profile("bulk")
+    session = SessionLocal()
+    cache = TokenCache(workers=workers)
+    changes = ChangeLog(CHANGES_FILE)
+    # any build covers the load_data runs finished before it starts
+    seq = changes.latest()
+    try:
+        store = FeatureStore()
+        if hashing:
+            build_hashed(session, store, cache)
+        elif incremental and store.has("game", "text"):
+            build_incremental(session, store, cache, changes, drift_threshold)
+        else:
+            build_tfidf(session, store, cache)
+        # the watermark belongs to the pipeline's store, not to side stores (FEATURE_STORE)
+        if not os.getenv("FEATURE_STORE"):
+            changes.ack(CONSUMER, seq)
+        print(f"✅ Text vectors built and saved ({cache.hits} texts from the token cache, "
+              f"{cache.misses} tokenized).")
+    finally:
+        cache.close()
+        session.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hashing", action="store_true",
+                        help="stream descriptions through a hashing vectorizer (flat memory, no vocabulary)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="transform only new/changed texts with the persisted vectorizer")
+    parser.add_argument("--drift_threshold", type=float, default=DRIFT_THRESHOLD,
+                        help="out-of-vocabulary share over the fit baseline that forces a refit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes that clean and tokenize texts missing from the token cache")
+    args = parser.parse_args()
+    if args.hashing and args.incremental:
+        parser.error("--incremental reuses a fitted vocabulary; drop --hashing")
+    with instrumented("build_text_vectors"):
+        main(args.hashing, args.incremental, args.drift_threshold, args.workers)
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from core.features import FeatureStore
+from core.scoring import DEFAULT_BLOCK_SIZE, load_matrices, score_range, similarity_terms
+
+# builders of the scoring features, run into each side store
+BUILDERS = ("scripts.build_genre_vectors", "scripts.build_text_vectors", "scripts.build_alias_map")
+
+
+def nbytes(mats: dict) -> int:
+    return sum(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes for X in mats.values())
+
+
+def build_store(path: str, dtype: str, hashing: bool = False) -> FeatureStore:
+    """Build the genre/text/alias features from the database into a side store stored as `dtype`."""
+    env = {**os.environ, "FEATURE_STORE": path, "FEATURE_DTYPE": dtype}
+    for module in BUILDERS:
+        args = ["--hashing"] if hashing and module == "scripts.build_text_vectors" else []
+        subprocess.run([sys.executable, "-m", module, *args], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+    return FeatureStore(path)
+
+
+def compare(ref, got, ref_scores, tol: float):
+    """
+    Count games whose top-k differs from the reference blocks; ref_scores are
+    the full float64 score rows of each block.
+    A differing movie only counts as a real mismatch when its reference score
+    is more than `tol` below the reference k-th score (otherwise it is a near-tie).
+    Returns (exact_order, same_set, real_mismatches, max_abs_score_diff).
+    """
+    exact = same = real = 0
+    max_diff = 0.0
+    for (_, _, r_idx, r_val), (_, _, g_idx, g_val), S in zip(ref, got, ref_scores):
+        for i in range(len(r_idx)):
+            exact += np.array_equal(r_idx[i], g_idx[i])
+            extra = np.setdiff1d(g_idx[i], r_idx[i])
+            same += not len(extra)
+            if len(extra) and (S[i, extra] < r_val[i, -1] - tol).any():
+                real += 1
+        max_diff = max(max_diff, float(np.abs(r_val - g_val).max(initial=0.0)))
+    return exact, same, real, max_diff
+
+
+def main(sample: int, alpha: float, beta: float, top_k: int, block_size: int,
+         dtype: str = 'float32', tol: float = 1e-5) -> int:
+    """
+    Score `sample` games in float64 and in `dtype` and check the top-k rankings agree.
+    Both sides are built fresh from the database (text features as the main
+    store's were, TF-IDF or hashed), one stored as float64 and one as `dtype`,
+    so the reference never passes through the lower precision.
+    """
+    hashing = FeatureStore().meta("text").get("vectorizer") == "hashing"
+    with tempfile.TemporaryDirectory(prefix="cinesteam_precision_") as tmp:
+        print(f"🔧 Building float64 and {dtype} feature stores…")
+        ref_store = build_store(os.path.join(tmp, "float64"), "float64", hashing)
+        store = build_store(os.path.join(tmp, dtype), dtype, hashing)
+        ref_mats, game_ids, _ = load_matrices(ref_store, dtype='float64')
+        mats, _, _ = load_matrices(store, dtype=dtype)
+        n = min(sample, len(game_ids))
+        print(f"🔧 {n} games, top_k={top_k}, float64 vs {dtype}")
+
+        t = time.perf_counter()
+        ref = list(score_range(ref_mats, 0, n, alpha, beta, top_k, block_size))
+        ref_s = time.perf_counter() - t
+        t = time.perf_counter()
+        got = list(score_range(mats, 0, n, alpha, beta, top_k, block_size))
+        got_s = time.perf_counter() - t
+
+        # full float64 score rows, to tell near-ties from real rank changes
+        ref_scores = []
+        for b_start, b_stop, _, _ in ref:
+            S_genre, S_text, A = similarity_terms(ref_mats, b_start, b_stop)
+            ref_scores.append(alpha * S_genre + (1 - alpha) * S_text + beta * A)
+
+        exact, same, real, max_diff = compare(ref, got, ref_scores, tol)
+        print(f"   memory   float64 {nbytes(ref_mats) / 2**20:8.1f} MiB   "
+              f"{dtype} {nbytes(mats) / 2**20:8.1f} MiB")
+        print(f"   scoring  float64 {ref_s:8.3f} s     {dtype} {got_s:8.3f} s")
+        print(f"   identical order {exact}/{n}, same set {same}/{n}, "
+              f"max score diff {max_diff:.2e}")
+        if real:
+            print(f"❌ {real} games rank a movie that is more than {tol:g} below the float64 top-{top_k}")
+            return 1
+        print(f"✅ {dtype} top-{top_k} matches float64 (up to ties within {tol:g})")
+        return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare top-k rankings against the float64 path')
+    parser.add_argument('--sample', type=int, default=5000, help='games to compare')
+    parser.add_argument('--alpha', type=float, default=0.5)
+    parser.add_argument('--beta', type=float, default=0.1)
+    parser.add_argument('--top_k', type=int, default=10)
+    parser.add_argument('--block_size', type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument('--dtype', default='float32', help='precision to check')
+    parser.add_argument('--tol', type=float, default=1e-5,
+                        help='score gap treated as a tie')
+    args = parser.parse_args()
+    sys.exit(main(args.sample, args.alpha, args.beta, args.top_k, args.block_size,
+                  args.dtype, args.tol))
@@ -1,9 +1,109 @@
+import time
+import argparse
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
 from sqlalchemy import func
-from core.db import SessionLocal
+from core.db import SessionLocal, use_profile
+from core.features import FeatureStore
 from core.models import Game, Recommendation, Movie
+from core.scoring import load_movie_matrices, normalize_rows, score_block, text_feature, top_k_rows
+from core.text import KeywordMatcher
+from scripts.build_alias_map import load_alias_keywords
+from scripts.build_text_embeddings import load_svd, project
+from scripts.build_text_vectors import load_vectorizer
 
-def main():
+
+class OnDemandScorer:
+    """
+    Scores one game at a time against the movie matrices, which are loaded and
+    normalized once per process. Games already in the feature store use their
+    stored rows; games loaded after the last feature build get genre and alias
+    rows computed from the DB and text rows from the persisted text vectorizer
+    (and LSA projection, with text='lsa'). Like the batch scorer, games
+    without a known genre get no recommendations. Results are kept in a small LRU.
+    """
+
+    def __init__(self, alpha: float = 0.5, beta: float = 0.1, top_k: int = 10,
+                 cache_size: int = 256, text: str = 'tfidf'):
+        self.alpha, self.beta, self.top_k = alpha, beta, top_k
+        self.store = FeatureStore()
+        self.mats, self.movie_ids = load_movie_matrices(self.store, text=text)
+        self.game_ids = self.store.ids('game')
+        # memory-mapped, rows are only read for the games actually looked up
+        self.game_mats = {name: self.store.get('game', name) for name in ('genre', 'alias')}
+        self.game_mats['text'] = self.store.get('game', text_feature(self.store, text))
+        self.projection = load_svd(self.store) if text == 'lsa' else None
+
+        self.genre_index = self.store.meta('genre').get('genre_index', {})
+        self.idf         = self.store.meta('genre').get('idf', {})
+        self.alias_index = {a: i for i, a in enumerate(self.store.meta('alias').get('aliases', []))}
+        self.alias_matcher = KeywordMatcher(load_alias_keywords())
+        self.text_vectorizer = load_vectorizer(self.store)
+
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def game_rows(self, game):
+        """Normalized (genre, text, alias) 1-row matrices for a game, None if it has no known genre."""
+        r = np.searchsorted(self.game_ids, game.id)
+        if r < len(self.game_ids) and self.game_ids[r] == game.id:
+            genre = self.game_mats['genre'][r]
+            if genre.nnz:
+                return (normalize_rows(genre),
+                        normalize_rows(self.game_mats['text'][r:r + 1]),
+                        self.game_mats['alias'][r])
+
+        # not built yet: encode genres with the stored index/idf, match aliases
+        cols = {self.genre_index[n]: self.idf[n]
+                for n in (g.name.strip().lower() for g in game.genres)
+                if n in self.genre_index and n in self.idf}
+        if not cols:
+            return None  # load_matrices leaves genreless games out of the batch scoring
+        dtype = self.mats['M_genre_T'].dtype
+        genre = sparse.csr_matrix((list(cols.values()), ([0] * len(cols), list(cols.keys()))),
+                                  shape=(1, self.mats['M_genre_T'].shape[0]), dtype=dtype)
+        text = sparse.csr_matrix((1, self.mats['M_text_T'].shape[0]), dtype=dtype)
+        if self.projection is not None:
+            text = np.zeros((1, self.mats['M_text_T'].shape[0]), dtype=dtype)
+        if self.text_vectorizer is not None and game.description:
+            row = sparse.csr_matrix(self.text_vectorizer.transform([game.description]), dtype=dtype)
+            if self.projection is not None and row.shape[1] == self.store.get('game', 'text').shape[1]:
+                text = project(self.projection, row)
+            elif row.shape == text.shape:  # else the vectorizer is not the one the features came from
+                text = row
+        hits = self.alias_matcher.find(game.description)
+        alias_cols = [self.alias_index[a] for a in hits if a in self.alias_index]
+        alias = sparse.csr_matrix((np.ones(len(alias_cols)), ([0] * len(alias_cols), alias_cols)),
+                                  shape=(1, self.mats['M_alias_T'].shape[0]), dtype=dtype)
+        return normalize_rows(genre), normalize_rows(text), alias
+
+    def recommend(self, game) -> list:
+        """[(movie_id, score), …] best first."""
+        if game.id in self.cache:
+            self.cache.move_to_end(game.id)
+            return self.cache[game.id]
+
+        rows = self.game_rows(game)
+        recs = []
+        if rows is not None:
+            G_genre, G_text, G_alias = rows
+            S = score_block(G_genre, G_text, self.mats['M_genre_T'], self.mats['M_text_T'],
+                            self.alpha, self.beta, G_alias, self.mats['M_alias_T'])
+            top_idx, top_val = top_k_rows(S, self.top_k)
+            recs = [(int(self.movie_ids[j]), float(s))
+                    for j, s in zip(top_idx[0], top_val[0]) if s > 0]
+
+        self.cache[game.id] = recs
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return recs
+
+
+def main(write_back: bool = False, alpha: float = 0.5, beta: float = 0.1, text: str = 'tfidf'):
+    use_profile("serving")
     s = SessionLocal()
+    scorer = None  # built on first miss
     try:
         while True:
             q = input("\nType a game name (exact/partial), blank to exit:\n→ ").strip()
@@ -26,15 +126,41 @@ def main():
                     .filter(Recommendation.game_id==game.id)\
                     .order_by(Recommendation.score.desc())\
                     .limit(10).all()
+            recs = [(m, r.score) for r, m in recs]
+
+            if not recs:
+                # nothing stored yet: score this game on demand
+                scorer = scorer or OnDemandScorer(alpha, beta, text=text)
+                t0 = time.perf_counter()
+                scored = scorer.recommend(game)
+                elapsed = (time.perf_counter() - t0) * 1000
+                movies = {m.id: m for m in s.query(Movie).filter(Movie.id.in_([m for m, _ in scored]))}
+                recs = [(movies[m_id], score) for m_id, score in scored if m_id in movies]
+                if recs:
+                    print(f"⚡ Scored on demand in {elapsed:.1f} ms")
+                if recs and write_back:
+                    s.add_all([Recommendation(game_id=game.id, movie_id=m_id, score=score)
+                               for m_id, score in scored])
+                    s.commit()
 
             if not recs:
                 print("📽️  (no recommendations)")
             else:
                 print("📽️  Top 10 movies:\n")
-                for i,(r,m) in enumerate(recs,1):
-                    print(f" {i:2d}. {m.title} ({m.release_year}) — {r.score:.3f}")
+                for i,(m,score) in enumerate(recs,1):
+                    print(f" {i:2d}. {m.title} ({m.release_year}) — {score:.3f}")
     finally:
         s.close()
 
 if __name__=="__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--write_back', action='store_true',
+                        help='store on-demand results in the recommendations table')
+    parser.add_argument('--alpha', type=float, default=0.5,
+                        help='genre weight for on-demand scoring')
+    parser.add_argument('--beta',  type=float, default=0.1,
+                        help='alias boost weight for on-demand scoring')
+    parser.add_argument('--text', choices=('tfidf', 'lsa'), default='tfidf',
+                        help='text similarity for on-demand scoring (match score_recommendations)')
+    args = parser.parse_args()
+    main(args.write_back, args.alpha, args.beta, args.text)
@@ -1,14 +1,19 @@
-from core.db import engine
+from core.db import use_profile
+from core.instrument import instrumented, stage
 from core.models import Base
 
 def main():
+    engine = use_profile("bulk")
     print("⚠️ Dropping all tables...")
+    stage("drop_all")
     Base.metadata.drop_all(bind=engine)
 
     print("🛠 Creating all tables...")
+    stage("create_all")
     Base.metadata.create_all(bind=engine)
 
     print("✅ Database schema initialized.")
 
 if __name__ == "__main__":
-    main()
+    with instrumented("init_db"):
+        main()
@@ -1,4 +1,5 @@
-from core.db import SessionLocal
+from core.db import SessionLocal, use_profile
+from core.instrument import instrumented, stage
 from core.models import Genre, GenreAlias
 
 GENRE_ALIASES = {
@@ -49,9 +50,11 @@ def normalize(s: str) -> str:
     return s.strip("[]'\" ").lower()
 
 def main():
+    use_profile("bulk")
     session = SessionLocal()
     try:
         # ensure every canonical genre row exists
+        stage("canonical genres")
         canons = {c for lst in GENRE_ALIASES.values() for c in lst if not c.startswith("_FLAG_")}
         for c in canons:
             session.query(Genre).filter_by(name=c).first() \
@@ -59,6 +62,7 @@ def main():
         session.commit()
 
         # clear old
+        stage("aliases", rows=len(GENRE_ALIASES))
         session.query(GenreAlias).delete()
         session.commit()
 
@@ -85,4 +89,5 @@ def main():
         session.close()
 
 if __name__=="__main__":
-    main()
+    with instrumented("load_aliases"):
+        main()
@@ -1,20 +1,51 @@
 import logging
 logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
 
-import csv, sys, os, ast
+import csv, sys, os, io, ast, argparse
+import multiprocessing as mp
+from itertools import chain
+import pandas as pd
 from dateutil.parser import parse
 from tqdm import tqdm
 
-from core.db import SessionLocal
+from core.db import SessionLocal, chunked, count_queries, use_profile
+from core.instrument import instrumented, stage
+from core.ingest import (
+    ChangeLog, Checkpoint, DimensionCache, YearParser, insert_ignore, map_unique, parse_list,
+    csv_header, ordered_map, read_blocks, record_hash, record_ranges
+)
 from core.models import (
     Game, Movie, Genre,
     Developer, Publisher, Platform,
-    Director, Actor
+    Director, Actor,
+    game_genres as game_genre_links, movie_genres as movie_genre_links,
+    game_developers, game_publishers, game_platforms,
+    movie_directors, movie_actors
 )
 
 csv.field_size_limit(sys.maxsize)
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 BATCH_SIZE = 500
+CHUNK_BYTES = 4 * 2**20   # byte range parsed per worker task
+# entity ids new/changed per run, kept until the builders that only redo the delta apply them
+CHANGES_FILE = os.path.join(DATA_DIR, "ingest_changes.json")
+# last committed byte offset per source file, for --resume
+CHECKPOINT_FILE = os.path.join(DATA_DIR, "ingest_checkpoint.json")
+DIMENSIONS = (Genre, Developer, Publisher, Platform, Director, Actor)
+# dimension → (association table, its dimension id column)
+GAME_LINKS = {
+    Genre:     (game_genre_links, "genre_id"),
+    Developer: (game_developers,  "developer_id"),
+    Publisher: (game_publishers,  "publisher_id"),
+    Platform:  (game_platforms,   "platform_id"),
+}
+MOVIE_LINKS = {
+    Genre:    (movie_genre_links, "genre_id"),
+    Director: (movie_directors,   "director_id"),
+    Actor:    (movie_actors,      "actor_id"),
+}
+STARS = ("Star1", "Star2", "Star3", "Star4")
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
 
 # Genres to skip when loading
 BANNED_GENRES = {
@@ -26,10 +57,15 @@ BANNED_GENRES = {
 }
 
 
-def load_csv(fn):
-    path = os.path.join(DATA_DIR, fn)
-    with open(path, newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+def batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 def extract_year(s):
@@ -39,157 +75,513 @@ def extract_year(s):
         return 0
 
 
-def get_or_create(session, model, **kw):
-    inst = session.query(model).filter_by(**kw).first()
-    if inst:
-        return inst
-    inst = model(**kw)
-    session.add(inst)
-    return inst
+# distinct release-date strings seen by this process → year (columnar readers)
+YEARS = YearParser(extract_year)
 
 
-def load_raw_genres(session):
-    raw_set = set()
-    # Steam genres
-    for r in load_csv("steam_games.csv"):
-        try:
-            gl = ast.literal_eval(r.get("genres", "[]"))
-        except:
+# ── field parsing (shared by the row and columnar readers) ───────────────
+def literal_list(s):
+    try:
+        return ast.literal_eval(s)
+    except:
+        return []
+
+
+def keep_genres(raw):
+    names = (str(r).strip().lower() for r in raw)
+    return [n for n in names if n and n not in BANNED_GENRES]
+
+
+def clean_platforms(raw):
+    # old 'platforms' list; new CSV uses windows/mac/linux flags, so skip
+    return [n for n in (str(r).strip().lower() for r in raw) if n]
+
+
+def split_names(s):
+    return [n.strip() for n in (s or "").split(",") if n.strip()]
+
+
+def game_genres(row):
+    """Kept (lower-cased) genre names of a Steam row."""
+    return keep_genres(literal_list(row.get("genres", "[]")))
+
+
+def movie_genres(row):
+    """Kept (lower-cased) genre names of an IMDb row."""
+    return keep_genres(row.get("Genre", "").split(","))
+
+
+def game_appid(row):
+    # Support new CSV column 'AppID' (or fallback to 'steam_appid')
+    raw_id = row.get("AppID") or row.get("steam_appid")
+    return int(raw_id) if raw_id else 0
+
+
+def movie_year(row):
+    return int(row.get("Released_Year") or 0)
+
+
+# ── row-by-row readers: one typed record per CSV row ─────────────────────
+def game_record(row):
+    """Typed fields of a Steam row; a row that fails to parse carries its error."""
+    try:
+        return with_hash({
+            "label": row.get("name"),
+            "appid": game_appid(row),
+            "name": row.get("name", "").strip(),
+            "release_year": extract_year(row.get("release_date", "")),
+            # Ingest detailed_description into description
+            "description": row.get("detailed_description", "").strip(),
+            "dims": {
+                Genre:     game_genres(row),
+                Developer: split_names(row.get("developers")),
+                Publisher: split_names(row.get("publishers")),
+                Platform:  clean_platforms(literal_list(row.get("platforms", "[]"))),
+            },
+        })
+    except Exception as e:
+        return {"label": row.get("name"), "error": e}
+
+
+def movie_record(row):
+    """Typed fields of an IMDb row; a row that fails to parse carries its error."""
+    try:
+        return with_hash({
+            "label": row.get("Series_Title"),
+            "title": row.get("Series_Title", ""),
+            "release_year": movie_year(row),
+            "overview": row.get("Overview", "").strip(),
+            "dims": {
+                Genre:    movie_genres(row),
+                Director: split_names(row.get("Director")),
+                Actor:    [s for s in (row.get(k, "").strip() for k in STARS) if s],
+            },
+        })
+    except Exception as e:
+        return {"label": row.get("Series_Title"), "error": e}
+
+
+def with_hash(rec):
+    rec["hash"] = record_hash(rec)
+    return rec
+
+
+# ── columnar readers: pandas frames, vectorized / per-distinct-value parsing ──
+def column(df, name):
+    return df[name] if name in df else pd.Series("", index=df.index, dtype=object)
+
+
+def parse_ints(values: pd.Series):
+    """
+    int() of each cell, 0 for empty cells; (ints, errors) with None where it
+    parsed. Values outside int64 (no DB key can hold them) are errors too.
+    """
+    ok = (values.str.fullmatch(r"\s*[+-]?\d+\s*") | (values == "")).tolist()
+    errors = [None if good else ValueError(f"invalid literal for int() with base 10: {v!r}")
+              for v, good in zip(values, ok)]
+    # more than 18 digits may not fit
+    wide = (values.str.strip().str.lstrip("+-").str.len() > 18).tolist()
+    for i in [i for i, w in enumerate(wide) if w and ok[i]]:
+        if not INT64_MIN <= int(values.iat[i]) <= INT64_MAX:
+            ok[i] = False
+            errors[i] = OverflowError(f"int too large for a 64-bit key: {values.iat[i].strip()!r}")
+    usable = pd.Series(ok, index=values.index) & (values != "")
+    ints = pd.to_numeric(values.where(usable, "0")).astype("int64").tolist()
+    return ints, errors
+
+
+def game_columns(chunks, years=None):
+    """Records of each DataFrame chunk, like game_record does row by row."""
+    years = years or YEARS
+    for df in chunks:
+        appid = column(df, "AppID").where(column(df, "AppID") != "", column(df, "steam_appid"))
+        appids, errors = parse_ints(appid)
+        cols = {
+            "label":        column(df, "name").tolist(),
+            "appid":        appids,
+            "name":         column(df, "name").str.strip().tolist(),
+            "release_year": years(column(df, "release_date")).tolist(),
+            "description":  column(df, "detailed_description").str.strip().tolist(),
+        }
+        dims = {
+            Genre:     map_unique(column(df, "genres"),
+                                  lambda s: keep_genres(parse_list(s, literal_list))),
+            Developer: map_unique(column(df, "developers"), split_names),
+            Publisher: map_unique(column(df, "publishers"), split_names),
+            Platform:  map_unique(column(df, "platforms"),
+                                  lambda s: clean_platforms(parse_list(s, literal_list))),
+        }
+        yield to_records(cols, dims, errors)
+
+
+def movie_columns(chunks):
+    """Records of each DataFrame chunk, like movie_record does row by row."""
+    for df in chunks:
+        years, errors = parse_ints(column(df, "Released_Year"))
+        stars = [column(df, k).str.strip() for k in STARS]
+        cols = {
+            "label":        column(df, "Series_Title").tolist(),
+            "title":        column(df, "Series_Title").tolist(),
+            "release_year": years,
+            "overview":     column(df, "Overview").str.strip().tolist(),
+        }
+        dims = {
+            Genre:    map_unique(column(df, "Genre"), lambda s: keep_genres(s.split(","))),
+            Director: map_unique(column(df, "Director"), split_names),
+            Actor:    [[s for s in row if s] for row in zip(*stars)],
+        }
+        yield to_records(cols, dims, errors)
+
+
+def to_records(cols, dims, errors):
+    """Turn a chunk's typed columns into the records the writers take."""
+    out = []
+    for i, err in enumerate(errors):
+        if err is not None:
+            out.append({"label": cols["label"][i], "error": err})
             continue
-        for raw in gl:
-            n = str(raw).strip().lower()
-            if n and n not in BANNED_GENRES:
-                raw_set.add(n)
-    # IMDb genres
-    for r in load_csv("imdb_top_1000.csv"):
-        for raw in r.get("Genre", "").split(","):  # IMDb columns
-            n = raw.strip().lower()
-            if n and n not in BANNED_GENRES:
-                raw_set.add(n)
-    for name in raw_set:
-        get_or_create(session, Genre, name=name)
+        rec = {name: values[i] for name, values in cols.items()}
+        rec["dims"] = {model: values[i] for model, values in dims.items()}
+        out.append(with_hash(rec))
+    return out
+
+
+# ── block readers: BATCH_SIZE records at a time, each tagged with its byte offset ──
+def parse_block(text, offsets, header, kind, columnar=False):
+    """Records of one block from core.ingest.read_blocks, with their end offsets."""
+    record, columns = READERS[kind]
+    buf = io.StringIO(text, newline="")
+    if columnar:
+        df = pd.read_csv(buf, names=header, header=None, dtype=str, keep_default_na=False)
+        records = next(columns([df]))
+    else:
+        records = [record(row) for row in csv.DictReader(buf, fieldnames=header)]
+    for rec, offset in zip(records, offsets):
+        rec["offset"] = offset
+    return records
+
+
+def read_batches(fn, kind, columnar=False, start=None):
+    """Batches of records from byte `start` (default: first record) to the end of `fn`."""
+    path = os.path.join(DATA_DIR, fn)
+    header, header_end = csv_header(path)
+    for text, offsets in read_blocks(path, header_end if start is None else start,
+                                     size=BATCH_SIZE):
+        yield parse_block(text, offsets, header, kind, columnar)
+
+
+def parse_range(task):
+    """Worker: the records of one byte range of a CSV (see core.ingest.record_ranges)."""
+    path, start, stop, header, kind, columnar = task
+    return [rec for text, offsets in read_blocks(path, start, stop, BATCH_SIZE)
+            for rec in parse_block(text, offsets, header, kind, columnar)]
+
+
+def parallel_batches(pool, fn, kind, workers, columnar=False, start=None):
+    """
+    Same batches as read_batches, parsed by `workers` processes.
+    Results are consumed in file order, so the writer assigns the same ids.
+    """
+    path = os.path.join(DATA_DIR, fn)
+    n_chunks = max(workers * 4, os.path.getsize(path) // CHUNK_BYTES)
+    header, ranges = record_ranges(path, n_chunks, start)
+    tasks = [(path, a, b, header, kind, columnar) for a, b in ranges]
+    records = chain.from_iterable(ordered_map(pool, parse_range, tasks, ahead=workers * 2))
+    return batched(records)
+
+
+# ── writers ──────────────────────────────────────────────────────────────
+def load_raw_genres(session, dims):
+    """
+    Genre pass of --full_read: the genres of both files, added batch by batch
+    and sorted within each batch, as add_dimensions adds them, so genre ids
+    are the same as in a streamed load.
+    """
+    for kind, fn in (("games", "steam_games.csv"), ("movies", "imdb_top_1000.csv")):
+        for batch in read_batches(fn, kind):
+            dims.add(Genre, sorted({name for rec in batch if "error" not in rec
+                                    for name in rec["dims"][Genre]}))
     session.commit()
 
 
-def load_games(session):
-    print(" Loading Steam games…")
-    rows, cnt = load_csv("steam_games.csv"), 0
-    for row in tqdm(rows, desc="Games", leave=True):
+def add_dimensions(session, dims, records):
+    """Insert the dimension names of a batch that have no row yet, in one flush."""
+    names = {}
+    for rec in records:
+        for model, found in rec.get("dims", {}).items():
+            names.setdefault(model, set()).update(found)
+    # sorted, so new names get the same ids on every run
+    if sum(dims.add(model, sorted(found)) for model, found in names.items()):
+        session.commit()
+
+
+def existing(session, model, column, keys, key):
+    """Rows of `model` already in the DB for one batch, by key(row)."""
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    return {key(obj): obj for obj in session.query(model).filter(column.in_(keys))}
+
+
+def write_links(session, dims, loaded, links, key, replace=()):
+    """
+    Link each loaded (entity, dimensions) pair to its dimension rows with one
+    ON CONFLICT DO NOTHING insert per association table. Entities in
+    `replace` lose their old links first.
+    """
+    session.flush()  # new entities need their ids
+    ids = [obj.id for obj in replace]
+    for table, _ in links.values():
+        for chunk in chunked(ids):
+            session.execute(table.delete().where(table.c[key].in_(chunk)))
+    pairs = {model: set() for model in links}
+    for obj, dimensions in loaded:
+        for model, names in dimensions.items():
+            for name in names:
+                d = dims.get(model, name)
+                if d is not None:
+                    pairs[model].add((obj.id, d.id))
+    for model, found in pairs.items():
+        table, col = links[model]
+        insert_ignore(session, table, [{key: a, col: b} for a, b in sorted(found)])
+
+
+def write_batch(session, dims, batch, find, store, links, key, changes, force=False):
+    """
+    Write one batch of records. find(records) returns the existing entities of
+    those records by key; store(session, rec, found, force) creates or updates
+    one entity and returns (entity, dimensions, 'new' | 'changed' | 'same').
+    Unchanged entities are left alone; `changes` collects the ids that moved.
+
+    Records that failed to parse are reported and skipped. The rest go out in
+    one commit; if that fails, the batch is redone row by row, each row in its
+    own SAVEPOINT, so a bad row (even one whose key cannot be looked up) costs
+    only itself.
+    """
+    good = []
+    for rec in batch:
+        if "error" in rec:
+            print(f"❌ Error loading {rec['label']}: {rec['error']}")
+            changes["failed"] += 1
+        else:
+            good.append(rec)
+    add_dimensions(session, dims, good)
+    try:
+        found = find(good)
+        done = [store(session, rec, found, force) for rec in good]
+        moved = [d for d in done if d[2] != "same"]
+        write_links(session, dims, [d[:2] for d in moved], links, key,
+                    [obj for obj, _, st in moved if st == "changed"])
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"⚠️  Batch failed ({e.__class__.__name__}), retrying row by row")
+        done = write_rows(session, dims, good, find, store, links, key, changes, force)
+    for obj, _, st in done:
+        if st == "same":
+            changes["unchanged"] += 1
+        else:
+            changes[st].append(obj.id)
+
+
+def write_rows(session, dims, records, find, store, links, key, changes, force=False):
+    """write_batch's fallback: one SAVEPOINT (and key lookup) per record, one commit at the end."""
+    done = []
+    for rec in records:
         try:
-            # Support new CSV column 'AppID' (or fallback to 'steam_appid')
-            raw_id = row.get("AppID") or row.get("steam_appid")
-            appid = int(raw_id) if raw_id else 0
-            year = extract_year(row.get("release_date", ""))
-
-            game = get_or_create(session, Game, steam_appid=appid)
-            game.name = row.get("name", "").strip()
-            game.release_year = year
-            # Ingest detailed_description into description
-            game.description = row.get("detailed_description", "").strip()
-
-            # genres
-            try:
-                gl = ast.literal_eval(row.get("genres", "[]"))
-            except:
-                gl = []
-            for raw in gl:
-                n = str(raw).strip().lower()
-                if not n or n in BANNED_GENRES:
-                    continue
-                g = session.query(Genre).filter(Genre.name.ilike(n)).first()
-                if g and g not in game.genres:
-                    game.genres.append(g)
-
-            # developers
-            for dn in row.get("developers", "").split(","):
-                dn = dn.strip()
-                if dn:
-                    d = get_or_create(session, Developer, name=dn)
-                    if d not in game.developers:
-                        game.developers.append(d)
-
-            # publishers
-            for pn in row.get("publishers", "").split(","):
-                pn = pn.strip()
-                if pn:
-                    p = get_or_create(session, Publisher, name=pn)
-                    if p not in game.publishers:
-                        game.publishers.append(p)
-
-            # platforms (old 'platforms' list; new CSV uses windows/mac/linux flags, so skip)
-            try:
-                pl = ast.literal_eval(row.get("platforms", "[]"))
-            except:
-                pl = []
-            for raw in pl:
-                n = str(raw).strip().lower()
-                if n:
-                    p = get_or_create(session, Platform, name=n)
-                    if p not in game.platforms:
-                        game.platforms.append(p)
-
-            cnt += 1
-            if cnt % BATCH_SIZE == 0:
-                session.commit()
+            with session.begin_nested():
+                obj, dimensions, st = store(session, rec, find([rec]), force)
+                if st != "same":
+                    write_links(session, dims, [(obj, dimensions)], links, key,
+                                [obj] if st == "changed" else [])
+            done.append((obj, dimensions, st))
         except Exception as e:
-            session.rollback()
-            print(f"❌ Error loading game {row.get('name')}: {e}")
+            print(f"❌ Error loading {rec['label']}: {e}")
+            changes["failed"] += 1
     session.commit()
-    print("✅ Steam games loaded.\n")
+    return done
+
 
+def new_changes():
+    return {"new": [], "changed": [], "unchanged": 0, "failed": 0}
 
-def load_movies(session):
+
+def resumed_changes(checkpoint):
+    """The changes committed before a resumed checkpoint, else an empty report."""
+    changes = new_changes()
+    if checkpoint is not None and checkpoint.changes:
+        changes.update(checkpoint.changes)
+    return changes
+
+
+def report_queries(queries, n_rows, label):
+    selects = queries.get("SELECT", 0)
+    print(f"🔎 {label}: {sum(queries.values())} SQL statements, {selects} SELECTs "
+          f"for {n_rows} rows ({selects / max(n_rows, 1):.3f} per row)")
+
+
+def report_changes(changes, label):
+    new, changed = set(changes["new"]), set(changes["changed"]) - set(changes["new"])
+    print(f"🔁 {label}: {len(new)} new, {len(changed)} changed, "
+          f"{changes['unchanged']} unchanged, {changes['failed']} failed")
+    return {"new": sorted(new), "changed": sorted(changed),
+            "unchanged": changes["unchanged"], "failed": changes["failed"]}
+
+
+def load_games(session, batches, dims, force=False, checkpoint=None):
+    """
+    Write batches of game records. Dimensions come from `dims` and each
+    batch's existing games from one query, so batches can be a one-pass stream.
+    Rows whose content hash matches the stored one are skipped unless `force`.
+    After each commit the source offset reached, and the changes so far, are
+    saved to `checkpoint`; a resumed checkpoint's changes are carried on.
+    Returns the new/changed game ids.
+    """
+    print(" Loading Steam games…")
+    n, changes = 0, resumed_changes(checkpoint)
+    with count_queries() as queries, tqdm(desc="Games", leave=True) as bar:
+        for batch in batches:
+            find = lambda recs: existing(session, Game, Game.steam_appid,
+                                         [rec["appid"] for rec in recs], lambda g: g.steam_appid)
+            write_batch(session, dims, batch, find, load_game, GAME_LINKS, "game_id",
+                        changes, force)
+            n += len(batch)
+            if checkpoint is not None and batch:
+                checkpoint.save(batch[-1]["offset"], checkpoint.rows + n, changes)
+            bar.update(len(batch))
+    print("✅ Steam games loaded.")
+    report_queries(queries, n, "games")
+    changes = report_changes(changes, "games")
+    print()
+    return changes
+
+
+def load_game(session, rec, games, force=False):
+    """Create or update the record's Game; see write_batch for the return value."""
+    game = games.get(rec["appid"])
+    if game is not None and game.content_hash == rec["hash"] and not force:
+        return game, rec["dims"], "same"
+    status = "new" if game is None else "changed"
+    if game is None:
+        game = games[rec["appid"]] = Game(steam_appid=rec["appid"])
+        session.add(game)
+    game.name = rec["name"]
+    game.release_year = rec["release_year"]
+    game.description = rec["description"]
+    game.content_hash = rec["hash"]
+
+    # genres, developers, publishers, platforms are linked per batch
+    return game, rec["dims"], status
+
+
+def load_movies(session, batches, dims, force=False, checkpoint=None):
+    """IMDb counterpart of load_games."""
     print(" Loading IMDb movies…")
-    rows, cnt = load_csv("imdb_top_1000.csv"), 0
-    for row in tqdm(rows, desc="Movies", leave=True):
-        try:
-            year = int(row.get("Released_Year") or 0)
-            movie = get_or_create(session, Movie, title=row.get("Series_Title", ""), release_year=year)
-            movie.overview = row.get("Overview", "").strip()
-
-            # genres (IMDb)
-            for raw in row.get("Genre", "").split(","):
-                n = raw.strip().lower()
-                if not n or n in BANNED_GENRES:
-                    continue
-                g = session.query(Genre).filter(Genre.name.ilike(n)).first()
-                if g and g not in movie.genres:
-                    movie.genres.append(g)
-
-            # directors
-            for dn in row.get("Director", "").split(","):
-                dn = dn.strip()
-                if dn:
-                    d = get_or_create(session, Director, name=dn)
-                    if d not in movie.directors:
-                        movie.directors.append(d)
-
-            # actors
-            for key in ["Star1", "Star2", "Star3", "Star4"]:
-                star = row.get(key, "").strip()
-                if star:
-                    a = get_or_create(session, Actor, name=star)
-                    if a not in movie.actors:
-                        movie.actors.append(a)
-
-            cnt += 1
-            if cnt % BATCH_SIZE == 0:
-                session.commit()
-        except Exception as e:
-            session.rollback()
-            print(f"❌ Error loading movie {row.get('Series_Title')}: {e}")
-    session.commit()
-    print("✅ IMDb movies loaded.\n")
+    n, changes = 0, resumed_changes(checkpoint)
+    with count_queries() as queries, tqdm(desc="Movies", leave=True) as bar:
+        for batch in batches:
+            find = lambda recs: existing(session, Movie, Movie.title,
+                                         [rec["title"] for rec in recs],
+                                         lambda m: (m.title, m.release_year))
+            write_batch(session, dims, batch, find, load_movie, MOVIE_LINKS, "movie_id",
+                        changes, force)
+            n += len(batch)
+            if checkpoint is not None and batch:
+                checkpoint.save(batch[-1]["offset"], checkpoint.rows + n, changes)
+            bar.update(len(batch))
+    print("✅ IMDb movies loaded.")
+    report_queries(queries, n, "movies")
+    changes = report_changes(changes, "movies")
+    print()
+    return changes
+
+
+def load_movie(session, rec, movies, force=False):
+    """Create or update the record's Movie; see write_batch for the return value."""
+    key = rec["title"], rec["release_year"]
+    movie = movies.get(key)
+    if movie is not None and movie.content_hash == rec["hash"] and not force:
+        return movie, rec["dims"], "same"
+    status = "new" if movie is None else "changed"
+    if movie is None:
+        movie = movies[key] = Movie(title=key[0], release_year=key[1])
+        session.add(movie)
+    movie.overview = rec["overview"]
+    movie.content_hash = rec["hash"]
+
+    # genres (IMDb), directors, actors are linked per batch
+    return movie, rec["dims"], status
+
+
+READERS = {"games": (game_record, game_columns), "movies": (movie_record, movie_columns)}
 
 
-def main():
-    session = SessionLocal()
+def main(mode="stream", workers=1, force=False, resume=False):
+    """
+    mode: 'stream'   – one pass per file, row by row, one batch in memory at a time
+          'full'     – read each file whole, genre pass first
+          'columnar' – pandas frames with vectorized field parsing
+    workers > 1 parses stream/columnar input in a process pool; this process
+    stays the only DB writer. Unchanged rows are skipped unless `force`; the
+    new/changed ids are added to the ChangeLog in CHANGES_FILE. The byte offset of each
+    committed batch, with the changes so far, is saved to CHECKPOINT_FILE; `resume`
+    starts each file from its saved offset and carries its changes into the run's
+    report, unless the file has changed since. Checkpoints are cleared once the
+    run is in the ChangeLog.
+    """
+    use_profile("bulk")
+    # cached dimension rows must survive the per-batch commits
+    session = SessionLocal(expire_on_commit=False)
+    pool = mp.Pool(workers) if workers > 1 else None
+    columnar = mode == "columnar"
     try:
-        load_raw_genres(session)
-        load_games(session)
-        load_movies(session)
+        dims = DimensionCache(session, DIMENSIONS)
+        if mode == "full":
+            stage("raw genres")
+            load_raw_genres(session, dims)
+        changes, checkpoints = {}, []
+        for kind, fn, load in (("games", "steam_games.csv", load_games),
+                               ("movies", "imdb_top_1000.csv", load_movies)):
+            checkpoint = Checkpoint(CHECKPOINT_FILE, os.path.join(DATA_DIR, fn))
+            checkpoints.append(checkpoint)
+            start = checkpoint.load() if resume else None
+            if start is not None:
+                print(f"⏩ Resuming {fn} at byte {start} ({checkpoint.rows} rows done)")
+            if pool is not None:
+                batches = parallel_batches(pool, fn, kind, workers, columnar, start)
+            else:
+                batches = read_batches(fn, kind, columnar, start)
+                if mode == "full":
+                    batches = list(batches)
+            st = stage(kind)
+            changes[kind] = load(session, batches, dims, force, checkpoint)
+            st["rows"] = (len(changes[kind]["new"]) + len(changes[kind]["changed"])
+                          + changes[kind]["unchanged"] + changes[kind]["failed"])
+        ChangeLog(CHANGES_FILE).append(changes)
+        # the run is reported in full; a later --resume starts over
+        for checkpoint in checkpoints:
+            checkpoint.clear()
     finally:
+        if pool is not None:
+            pool.terminate()
         session.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--full_read", action="store_true",
+                      help="read each file whole (genre pass first) instead of streaming")
+    mode.add_argument("--columnar", action="store_true",
+                      help="parse pandas frames column by column instead of row by row")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parsing processes (byte ranges of each file); one DB writer")
+    parser.add_argument("--force", action="store_true",
+                        help="rewrite every row, even when its content hash is unchanged")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue each file from its last committed batch")
+    args = parser.parse_args()
+    if args.workers > 1 and args.full_read:
+        parser.error("--workers parses streamed input; drop --full_read")
+    with instrumented("load_data"):
+        main("full" if args.full_read else "columnar" if args.columnar else "stream",
+             args.workers, args.force, args.resume)
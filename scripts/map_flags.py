@@ -1,15 +1,68 @@
-from core.db import SessionLocal
-from core.models import GenreAlias, Game, Movie
+import numpy as np
+from sqlalchemy import exists, func, select, update
+from core.db import SessionLocal, use_profile
+from core.features import FeatureStore
+from core.instrument import instrumented, stage
+from core.models import GenreAlias, Genre, Game, Movie, game_genres, movie_genres
 
 # Keywords in aliases that should trigger flags
 ADULT_FLAGS = {'nudity', 'adult', 'sexual content'}
 MULTIPLAYER_FLAGS = {'multiplayer', 'online co-op', 'massively multiplayer'}
 TV_FLAGS = {'episodic', 'tv-style'}
+FLAG_COLUMNS = ('is_adult', 'is_multiplayer', 'is_tv_format')
+STREAM_BATCH = 5000   # rows fetched per chunk when storing the flags
 
 def normalize(name: str) -> str:
     return name.strip("[]' ").lower()
 
+def flag_genres(session, flag_map) -> dict:
+    """Genre ids per flag column: the genres whose normalized name is a flagged alias."""
+    genre_ids = {column: [] for column in FLAG_COLUMNS}
+    for genre_id, name in session.query(Genre.id, Genre.name):
+        column = flag_map.get(normalize(name))
+        if column:
+            genre_ids[column].append(genre_id)
+    return genre_ids
+
+def apply_flags(session, model, link, key, genre_ids) -> int:
+    """
+    One UPDATE … WHERE EXISTS per flag: set it on every row of `model` linked
+    (through `link`) to one of its genres. Returns the number of rows updated.
+    """
+    updated = 0
+    for column, ids in genre_ids.items():
+        if not ids:
+            continue
+        linked = exists().where(link.c[key] == model.id, link.c.genre_id.in_(ids))
+        stmt = update(model).where(linked).values({column: True})
+        updated += session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+    return updated
+
+def store_flags(session, store, side, model):
+    """
+    Dense uint8 matrix (one column per FLAG_COLUMNS entry) into the feature store.
+    Rows are streamed in chunks into arrays sized from a COUNT(*) up front,
+    so no ORM row list is held in memory.
+    """
+    n = session.scalar(select(func.count()).select_from(model))
+    ids = np.empty(n, dtype=np.int64)
+    X = np.zeros((n, len(FLAG_COLUMNS)), dtype=np.uint8)
+    stmt = (select(model.id, *[getattr(model, c) for c in FLAG_COLUMNS])
+            .execution_options(yield_per=STREAM_BATCH))
+    filled = 0
+    for rows in session.execute(stmt).partitions():
+        end = filled + len(rows)
+        if end > len(ids):  # rows inserted since the count
+            ids = np.resize(ids, end)
+            X = np.resize(X, (end, len(FLAG_COLUMNS)))
+        ids[filled:end] = [r[0] for r in rows]
+        X[filled:end] = [[bool(v) for v in r[1:]] for r in rows]
+        filled = end
+    store.put(side, 'flags', X[:filled], ids[:filled], meta={'columns': list(FLAG_COLUMNS)})
+
+
 def main():
+    use_profile("bulk")
     session = SessionLocal()
     try:
         # Build lookup
@@ -24,23 +77,20 @@ def main():
             elif norm in TV_FLAGS:
                 flag_map[norm] = 'is_tv_format'
 
-        # Flag games
-        games = session.query(Game).all()
-        for game in games:
-            for genre in game.genres:
-                gname = normalize(genre.name)
-                if gname in flag_map:
-                    setattr(game, flag_map[gname], True)
-
-        # Flag movies
-        movies = session.query(Movie).all()
-        for movie in movies:
-            for genre in movie.genres:
-                gname = normalize(genre.name)
-                if gname in flag_map:
-                    setattr(movie, flag_map[gname], True)
+        # Flag games and movies in the DB, no rows loaded into Python
+        genre_ids = flag_genres(session, flag_map)
+        st = stage("flag games")
+        st["rows"] = apply_flags(session, Game, game_genres, "game_id", genre_ids)
+        st = stage("flag movies")
+        st["rows"] = apply_flags(session, Movie, movie_genres, "movie_id", genre_ids)
 
+        stage("commit")
         session.commit()
+
+        stage("feature store")
+        store = FeatureStore()
+        store_flags(session, store, 'game', Game)
+        store_flags(session, store, 'movie', Movie)
         print("✅ Flags applied to all games and movies.")
     except Exception as e:
         session.rollback()
@@ -49,4 +99,5 @@ def main():
         session.close()
 
 if __name__ == "__main__":
-    main()
+    with instrumented("map_flags"):
+        main()
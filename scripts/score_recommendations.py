@@ -1,86 +1,182 @@
 import os
-import json
 import argparse
+import tempfile
+import multiprocessing as mp
 import numpy as np
-from tqdm import tqdm
 from scipy import sparse
-from core.db import SessionLocal
-from core.models import Recommendation
-
-
-def normalize_rows(X):
-    norms = np.sqrt(X.multiply(X).sum(axis=1)).A1
-    norms[norms == 0] = 1.0
-    inv = sparse.diags(1.0 / norms)
-    return inv.dot(X)
-
-
-def main(alpha: float, beta: float, top_k: int = 10):
-    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
-
-    # load genre vectors
-    with open(os.path.join(data_dir, 'genre_vectors.json')) as f:
-        gv = json.load(f)
-    genre_game_ids  = list(map(int, gv['game_vectors'].keys()))
-    genre_movie_ids = list(map(int, gv['movie_vectors'].keys()))
-    G_genre = sparse.csr_matrix(list(gv['game_vectors'].values()))
-    M_genre = sparse.csr_matrix(list(gv['movie_vectors'].values()))
-
-    # load text vectors & meta
-    G_text = sparse.load_npz(os.path.join(data_dir, 'game_text.npz'))
-    M_text = sparse.load_npz(os.path.join(data_dir, 'movie_text.npz'))
-    with open(os.path.join(data_dir, 'text_meta.json')) as f:
-        tm = json.load(f)
-    text_game_ids  = tm['game_ids']
-    text_movie_ids = tm['movie_ids']
-
-    # load alias map
-    with open(os.path.join(data_dir, 'alias_map.json')) as f:
-        amap = json.load(f)
-    game_alias_map  = {int(k): set(v) for k, v in amap['game_aliases'].items()}
-    movie_alias_map = {int(k): set(v) for k, v in amap['movie_aliases'].items()}
-
-    # normalize
-    G_genre = normalize_rows(G_genre)
-    M_genre = normalize_rows(M_genre)
-    G_text  = normalize_rows(G_text)
-    M_text  = normalize_rows(M_text)
-
-    # assume consistent ordering
-    game_ids  = genre_game_ids
-    movie_ids = genre_movie_ids
+from tqdm import tqdm
+from core.db import SessionLocal, chunked, use_profile
+from core.features import FEATURE_DTYPE, save_csr, load_csr
+from core.instrument import instrumented, stage
+from core.models import RecommendationFingerprint
+from core.candidates import (
+    CandidateIndex, DEFAULT_TOP_TERMS, DEFAULT_MAX_DF, PRUNED_BLOCK_SIZE, score_range_pruned
+)
+from core.writer import RecommendationWriter
+from core.scoring import (
+    DEFAULT_BLOCK_SIZE, TEXT_FEATURES, load_matrices, score_range,
+    matrix_digest, row_fingerprints
+)
+
+SHARED = ('G_genre', 'G_text', 'G_alias', 'M_genre_T', 'M_text_T', 'M_alias_T')
+GAME_SIDE = ('G_genre', 'G_text', 'G_alias')
+
+# per-worker state, filled by _init_worker
+_worker = {}
+
+
+def share(shared_dir, name, X):
+    """Write a scoring matrix for the workers: CSR parts, or one .npy for dense (LSA) ones."""
+    if sparse.issparse(X):
+        save_csr(shared_dir, name, X)
+    else:
+        np.save(os.path.join(shared_dir, name + '.npy'), X)
+
+
+def load_shared(shared_dir, name):
+    path = os.path.join(shared_dir, name + '.npy')
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    return load_csr(shared_dir, name)
+
+
+def _init_worker(shared_dir, game_ids, movie_ids, alpha, beta, top_k, block_size,
+                 candidates, top_terms, max_df):
+    _worker['mats'] = {name: load_shared(shared_dir, name) for name in SHARED}
+    _worker['game_ids'] = np.load(game_ids, mmap_mode='r')
+    _worker['movie_ids'] = np.load(movie_ids, mmap_mode='r')
+    _worker['index'] = (CandidateIndex(_worker['mats'], alpha, beta, top_terms, max_df)
+                        if candidates else None)
+    _worker['params'] = (alpha, beta, top_k, block_size, candidates)
+
+
+def _score_shard(bounds):
+    start, stop = bounds
+    alpha, beta, top_k, block_size, candidates = _worker['params']
+    return collect(_worker['mats'], _worker['game_ids'], _worker['movie_ids'],
+                   start, stop, alpha, beta, top_k, block_size,
+                   _worker['index'], candidates)
+
 
+def collect(mats, game_ids, movie_ids, start, stop, alpha, beta, top_k, block_size,
+            index=None, candidates=0):
+    """
+    Top-k of game rows start..stop as flat (game_id, movie_id, score) arrays, positive scores only.
+    With a CandidateIndex, only each game's `candidates` best-matching movies are scored.
+    """
+    if index is not None:
+        blocks = score_range_pruned(mats, index, start, stop, top_k,
+                                    min(block_size, PRUNED_BLOCK_SIZE), candidates)
+    else:
+        blocks = score_range(mats, start, stop, alpha, beta, top_k, block_size)
+    g_out, m_out, s_out = [], [], []
+    for b_start, b_stop, top_idx, top_val in blocks:
+        keep = top_val > 0
+        g_out.append(np.repeat(game_ids[b_start:b_stop], top_idx.shape[1])[keep.ravel()])
+        m_out.append(movie_ids[top_idx][keep])
+        s_out.append(top_val[keep])
+    if not g_out:
+        return stop - start, np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    return stop - start, np.concatenate(g_out), np.concatenate(m_out), np.concatenate(s_out)
+
+
+def delete_fingerprints(session, game_ids):
+    for chunk in chunked(int(g) for g in game_ids):
+        session.query(RecommendationFingerprint)\
+               .filter(RecommendationFingerprint.game_id.in_(chunk))\
+               .delete(synchronize_session=False)
+
+
+def save_fingerprints(session, game_ids, fingerprints):
+    session.bulk_insert_mappings(RecommendationFingerprint, [
+        {'game_id': int(g), 'fingerprint': fp} for g, fp in zip(game_ids, fingerprints)
+    ])
+
+
+def main(alpha: float, beta: float, top_k: int = 10,
+         block_size: int = DEFAULT_BLOCK_SIZE, workers: int = 1,
+         incremental: bool = False, candidates: int = 0,
+         top_terms: int = DEFAULT_TOP_TERMS, max_df: float = DEFAULT_MAX_DF,
+         dtype: str = None, text: str = 'tfidf'):
+    dtype = np.dtype(dtype or FEATURE_DTYPE)
+    stage("load matrices")
+    mats, game_ids, movie_ids = load_matrices(dtype=dtype, text=text)
+
+    # per-game fingerprint: its own feature rows + params + the whole movie side
+    pruning = f"{candidates}/{top_terms}/{max_df}" if candidates else "exact"
+    stage("fingerprints", rows=len(game_ids))
+    salt = f"{alpha!r}|{beta!r}|{top_k}|{pruning}|{dtype}|{text}|" + matrix_digest(
+        mats['M_genre_T'], mats['M_text_T'], mats['M_alias_T'], movie_ids)
+    fingerprints = row_fingerprints([mats[name] for name in GAME_SIDE], salt)
+
+    engine = use_profile("bulk")
     session = SessionLocal()
-    session.query(Recommendation).delete()
-    session.commit()
+    replace_ids = None  # None = replace the whole table at swap time
+    if incremental:
+        stored = dict(session.query(RecommendationFingerprint.game_id,
+                                    RecommendationFingerprint.fingerprint))
+        changed = [i for i, (g, fp) in enumerate(zip(game_ids, fingerprints))
+                   if stored.get(int(g)) != fp]
+        gone = set(stored) - set(game_ids.tolist())
+        print(f"🔁 Incremental: {len(changed)} new/changed games, {len(gone)} removed, "
+              f"{len(game_ids) - len(changed)} unchanged")
+
+        replace_ids = game_ids[changed].tolist() + sorted(gone)
+
+        # only the changed rows go through the scorer
+        for name in GAME_SIDE:
+            mats[name] = mats[name][changed]
+        game_ids = game_ids[changed]
+        fingerprints = [fingerprints[i] for i in changed]
+
+    stage("score", rows=len(game_ids))
+    writer = RecommendationWriter(engine).open()
+    print(f"🔧 Scoring with alpha={alpha:.2f}, beta={beta:.2f}, top_k={top_k}, "
+          f"block_size={block_size}, workers={workers}, candidates={pruning}, dtype={dtype}, "
+          f"text={text}")
+    with tqdm(total=len(game_ids), desc="Games") as bar:
+        if workers <= 1:
+            index = CandidateIndex(mats, alpha, beta, top_terms, max_df) if candidates else None
+            for start in range(0, len(game_ids), block_size):
+                stop = min(start + block_size, len(game_ids))
+                n, g, m, sc = collect(mats, game_ids, movie_ids, start, stop,
+                                      alpha, beta, top_k, block_size, index, candidates)
+                writer.write(g, m, sc)
+                bar.update(n)
+        else:
+            # share the matrices through memory-mapped files instead of pickling them per task
+            with tempfile.TemporaryDirectory(prefix='cinesteam_scoring_') as shared_dir:
+                for name in SHARED:
+                    share(shared_dir, name, mats[name])
+                gid_path = os.path.join(shared_dir, 'game_ids.npy')
+                mid_path = os.path.join(shared_dir, 'movie_ids.npy')
+                np.save(gid_path, game_ids)
+                np.save(mid_path, movie_ids)
 
-    total = 0
-    print(f"🔧 Scoring with alpha={alpha:.2f}, beta={beta:.2f}, top_k={top_k}")
-    for i, g_id in enumerate(tqdm(game_ids, desc="Games")):
-        vg = G_genre[i].toarray().ravel()
-        vt = G_text[i].toarray().ravel()
-        mg = M_genre.dot(vg)           # genre score
-        mt = M_text.dot(vt)            # text score
-
-        recs = []
-        # compute combined scores for all movies
-        for j, m_id in enumerate(movie_ids):
-            alias_bonus = 1.0 if (game_alias_map.get(g_id, set()) & movie_alias_map.get(m_id, set())) else 0.0
-            score = alpha * mg[j] + (1-alpha) * mt[j] + beta * alias_bonus
-            recs.append((j, score))
-        # pick top_k
-        top = sorted(recs, key=lambda x: -x[1])[:top_k]
-        objs = [Recommendation(game_id=g_id, movie_id=movie_ids[j], score=float(s))
-                for j, s in top if s > 0]
-
-        session.bulk_save_objects(objs)
-        total += len(objs)
-        if i and i % 500 == 0:
-            session.commit()
+                # several shards per worker keeps the pool busy until the end
+                shard = max(block_size, -(-len(game_ids) // (workers * 4)))
+                shards = [(s, min(s + shard, len(game_ids)))
+                          for s in range(0, len(game_ids), shard)]
+                with mp.Pool(workers, initializer=_init_worker,
+                             initargs=(shared_dir, gid_path, mid_path,
+                                       alpha, beta, top_k, block_size,
+                                       candidates, top_terms, max_df)) as pool:
+                    # this process stays the single DB writer
+                    for n, g, m, sc in pool.imap_unordered(_score_shard, shards):
+                        writer.write(g, m, sc)
+                        bar.update(n)
 
+    # new rows and their fingerprints become visible in one commit
+    stage("swap", rows=writer.rows)
+    writer.swap(session, replace_ids)
+    if replace_ids is None:
+        session.query(RecommendationFingerprint).delete()
+    else:
+        delete_fingerprints(session, replace_ids)
+    save_fingerprints(session, game_ids, fingerprints)
     session.commit()
     session.close()
-    print(f"✅ Stored {total} recommendations.")
+    print(f"✅ Stored {writer.rows} recommendations.")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -90,5 +186,27 @@ if __name__ == '__main__':
                         help='alias boost weight')
     parser.add_argument('--top_k',type=int,   default=10,
                         help='number of recs per game')
+    parser.add_argument('--block_size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='games scored per matrix product')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='scoring processes (shards the game range)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rescore games whose feature fingerprint changed')
+    parser.add_argument('--candidates', type=int, default=0,
+                        help='score only this many index candidates per game (0 = all movies)')
+    parser.add_argument('--top_terms', type=int, default=DEFAULT_TOP_TERMS,
+                        help='TF-IDF terms per title used as index postings')
+    parser.add_argument('--max_df', type=float, default=DEFAULT_MAX_DF,
+                        help='skip index postings shared by more than this share of movies')
+    parser.add_argument('--dtype', choices=('float32', 'float64'), default=None,
+                        help='scoring precision (default FEATURE_DTYPE, float32)')
+    parser.add_argument('--text', choices=tuple(TEXT_FEATURES), default='tfidf',
+                        help='text similarity from sparse TF-IDF rows or the dense LSA embedding '
+                             '(run scripts.build_text_embeddings first)')
     args = parser.parse_args()
-    main(args.alpha, args.beta, args.top_k)
+    if args.candidates and args.text != 'tfidf':
+        parser.error("--candidates indexes TF-IDF terms; it needs --text tfidf")
+    with instrumented("score_recommendations"):
+        main(args.alpha, args.beta, args.top_k, args.block_size, args.workers,
+             args.incremental, args.candidates, args.top_terms, args.max_df, args.dtype,
+             args.text)
@@ -1,5 +1,9 @@
-import subprocess
+import os
 import sys
+import json
+import time
+import subprocess
+from core.instrument import RUN_ID_ENV, load_reports, run_dir, summarize
 
 STEPS = [
     ("init_db",            "Initialize database"),
@@ -24,10 +28,28 @@ def run_step(script, label):
         sys.exit(1)
     print(f"✅ {label} completed.")
 
+def report_run(directory):
+    """Aggregate the steps' timing reports into <run dir>/summary.json and print it."""
+    summary = summarize(load_reports(directory))
+    with open(os.path.join(directory, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n📊 {'step':<22} {'seconds':>8} {'peak MiB':>9} {'SQL stmts':>10} {'SQL s':>7}")
+    for s in summary["scripts"]:
+        print(f"   {s['script']:<22} {s['seconds']:8.2f} {s['peak_rss_mb']:9.0f} "
+              f"{s['sql_statements']:10d} {s['sql_seconds']:7.2f}")
+    print(f"   {'total':<22} {summary['seconds']:8.2f} {summary['peak_rss_mb']:9.0f} "
+          f"{summary['sql_statements']:10d} {summary['sql_seconds']:7.2f}")
+    print(f"   written to {os.path.relpath(directory)}/summary.json")
+
+
 def main():
+    # every step writes its timing report into this run's folder
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    os.environ[RUN_ID_ENV] = run_id
     for script, label in STEPS:
         run_step(script, label)
     print("\n🎉 All setup steps completed successfully!")
+    report_run(run_dir(run_id))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from tqdm import tqdm
+from core.scoring import DEFAULT_BLOCK_SIZE, load_matrices, similarity_terms, top_k_rows
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+
+def parse_list(s: str, cast):
+    return [cast(v) for v in s.split(',') if v.strip()]
+
+
+def setting_name(alpha: float, beta: float, top_k: int) -> str:
+    return f"alpha={alpha:g}_beta={beta:g}_k={top_k}"
+
+
+def main(alphas, betas, top_ks, block_size: int = DEFAULT_BLOCK_SIZE, out_dir: str = None):
+    """
+    Score every (alpha, beta, top_k) combination from one pass over the games.
+    The genre, text and alias similarity blocks are computed once per block of
+    games; each setting only re-weights them and picks its top-k.
+    Results go to one CSV per setting (game_id,movie_id,score), never the live table.
+    """
+    out_dir = out_dir or os.path.join(DATA_DIR, 'sweeps', time.strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(out_dir, exist_ok=True)
+
+    t0 = time.perf_counter()
+    mats, game_ids, movie_ids = load_matrices()
+    timing = {'load_s': time.perf_counter() - t0, 'similarity_s': 0.0, 'write_s': 0.0}
+
+    # top_k only truncates, so each (alpha, beta) pair is ranked once at the largest k
+    pairs  = list(itertools.product(alphas, betas))
+    max_k  = max(top_ks)
+    files  = {}
+    counts = {}
+    for (alpha, beta), k in itertools.product(pairs, top_ks):
+        name = setting_name(alpha, beta, k)
+        files[name] = open(os.path.join(out_dir, name + '.csv'), 'w')
+        files[name].write('game_id,movie_id,score\n')
+        counts[name] = 0
+    rank_s = {pair: 0.0 for pair in pairs}
+
+    print(f"🔧 Sweeping {len(pairs)} alpha/beta pairs × top_k {top_ks} over {len(game_ids)} games")
+    try:
+        for start in tqdm(range(0, len(game_ids), block_size), desc="Blocks"):
+            stop = min(start + block_size, len(game_ids))
+            t = time.perf_counter()
+            S_genre, S_text, A = similarity_terms(mats, start, stop)
+            timing['similarity_s'] += time.perf_counter() - t
+
+            block_ids = game_ids[start:stop]
+            for alpha, beta in pairs:
+                t = time.perf_counter()
+                S = alpha * S_genre + (1 - alpha) * S_text + beta * A
+                top_idx, top_val = top_k_rows(S, max_k)
+                rank_s[(alpha, beta)] += time.perf_counter() - t
+
+                t = time.perf_counter()
+                for k in top_ks:
+                    idx, val = top_idx[:, :k], top_val[:, :k]
+                    keep = val > 0
+                    rows = np.column_stack((
+                        np.repeat(block_ids, idx.shape[1])[keep.ravel()],
+                        movie_ids[idx][keep],
+                        val[keep],
+                    ))
+                    name = setting_name(alpha, beta, k)
+                    np.savetxt(files[name], rows, fmt=('%d', '%d', '%.6f'), delimiter=',')
+                    counts[name] += len(rows)
+                timing['write_s'] += time.perf_counter() - t
+    finally:
+        for f in files.values():
+            f.close()
+
+    timing['total_s'] = time.perf_counter() - t0
+    summary = {
+        'games': int(len(game_ids)),
+        'movies': int(len(movie_ids)),
+        'block_size': block_size,
+        'timing': timing,
+        'settings': [
+            {'alpha': alpha, 'beta': beta, 'top_k': k,
+             'file': setting_name(alpha, beta, k) + '.csv',
+             'rows': counts[setting_name(alpha, beta, k)],
+             'rank_s': rank_s[(alpha, beta)]}
+            for (alpha, beta), k in itertools.product(pairs, top_ks)
+        ],
+    }
+    with open(os.path.join(out_dir, 'sweep.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"✅ {len(files)} settings written to {out_dir} in {timing['total_s']:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--alphas', default='0.3,0.5,0.7',
+                        help='comma-separated genre weights')
+    parser.add_argument('--betas',  default='0.0,0.1,0.2',
+                        help='comma-separated alias boost weights')
+    parser.add_argument('--top_ks', default='10',
+                        help='comma-separated numbers of recs per game')
+    parser.add_argument('--block_size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='games scored per matrix product')
+    parser.add_argument('--out_dir', default=None,
+                        help='output directory (default data/sweeps/<timestamp>)')
+    args = parser.parse_args()
+    main(parse_list(args.alphas, float), parse_list(args.betas, float),
+         parse_list(args.top_ks, int), args.block_size, args.out_dir)
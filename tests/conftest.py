@@ -0,0 +1,4 @@
+import os
+
+# core.db builds its engine at import; the tests never touch the database
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
@@ -0,0 +1,31 @@
+import numpy as np
+from scipy import sparse
+from core.features import FeatureStore
+
+
+def test_store_keeps_canonical_csr(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    ids = np.arange(0, 100, 2)
+    X = sparse.random(len(ids), 300, density=0.1, format='csr', dtype=np.float32, random_state=0)
+    store.put('game', 'text', X, ids)
+    store.put('game', 'alias', X[:, :20], ids)
+    # new ids realign the other features through reindex
+    store.put_rows('game', 'text', X[:3], [1, 51, 99])
+
+    for name in ('text', 'alias'):
+        stored = store.get('game', name)
+        fresh = sparse.csr_matrix((np.asarray(stored.data), np.asarray(stored.indices),
+                                   np.asarray(stored.indptr)), shape=stored.shape)
+        assert fresh.has_canonical_format, name
+
+
+def test_built_ids_include_empty_rows(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    X = sparse.csr_matrix(np.array([[1, 0], [0, 0], [0, 2]], dtype=np.float32))
+    store.put('game', 'text', X, [5, 3, 9])
+    # another feature grows the index; those ids were never built for 'text'
+    store.put('game', 'alias', sparse.csr_matrix((2, 4), dtype=np.float32), [4, 7])
+    assert store.built_ids('game', 'text').tolist() == [3, 5, 9]
+
+    store.put_rows('game', 'text', sparse.csr_matrix((1, 2), dtype=np.float32), [7])
+    assert store.built_ids('game', 'text').tolist() == [3, 5, 7, 9]
@@ -0,0 +1,44 @@
+import numpy as np
+from scipy import sparse
+from core.features import FeatureStore
+from core.scoring import matrix_digest, row_fingerprints
+
+
+def random_rows(n, n_cols, seed):
+    return sparse.random(n, n_cols, density=0.2, format='csr', dtype=np.float32,
+                         random_state=seed)
+
+
+def fingerprints_by_id(store):
+    ids = store.ids('game')
+    fps = row_fingerprints([store.get('game', 'genre'), store.get('game', 'text')], 'salt')
+    return dict(zip(ids.tolist(), fps))
+
+
+def test_adding_an_id_keeps_other_fingerprints(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    ids = np.arange(10, 210, 2)
+    store.put('game', 'genre', random_rows(len(ids), 30, 0), ids)
+    store.put('game', 'text', random_rows(len(ids), 500, 1), ids)
+    before = fingerprints_by_id(store)
+
+    # an id in the middle of the index realigns every stored feature
+    store.put_rows('game', 'genre', random_rows(1, 30, 2), [101])
+    store.put_rows('game', 'text', random_rows(1, 500, 3), [101])
+    after = fingerprints_by_id(store)
+
+    assert set(after) == set(before) | {101}
+    assert {i: after[i] for i in before} == before
+
+
+def test_digest_ignores_index_order():
+    X = random_rows(20, 40, 4)
+    shuffled = X.copy()
+    for r in range(X.shape[0]):
+        lo, hi = shuffled.indptr[r], shuffled.indptr[r + 1]
+        order = np.arange(lo, hi)[::-1]
+        shuffled.indices[lo:hi] = X.indices[order]
+        shuffled.data[lo:hi] = X.data[order]
+    shuffled.has_sorted_indices = False
+    assert matrix_digest(shuffled) == matrix_digest(X)
+    assert row_fingerprints([shuffled]) == row_fingerprints([X])
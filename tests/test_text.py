@@ -0,0 +1,53 @@
+import json
+import os
+import pytest
+from core.text import KeywordMatcher, keyword_stem
+
+ALIAS_KEYWORDS = os.path.join(os.path.dirname(__file__), '..', 'data', 'alias_keywords.json')
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    with open(ALIAS_KEYWORDS) as f:
+        return KeywordMatcher(json.load(f))
+
+
+@pytest.mark.parametrize('text, alias', [
+    ('A haunted house', 'horror'),
+    ('mythical beasts', 'mythology'),
+    ('the infected', 'zombie'),
+    ('godlike powers', 'superhero'),
+    ('two serial killers', 'horror'),
+])
+def test_inflected_forms_match(matcher, text, alias):
+    assert alias in matcher.find(text)
+
+
+@pytest.mark.parametrize('text, alias', [
+    ('software engineer', 'war'),
+    ('a daring escape', 'superhero'),
+    ('her husband', 'musical'),
+])
+def test_keyword_inside_a_word_does_not_match(matcher, text, alias):
+    assert alias not in matcher.find(text)
+
+
+def test_phrase_words_match_in_order():
+    m = KeywordMatcher({'horror': ['serial killer']})
+    assert m.find('serial killers on the loose') == ['horror']
+    assert m.find('a killer serial') == []
+    assert m.find('serial') == []
+
+
+def test_keyword_stem():
+    assert keyword_stem('infection') == 'infect'
+    assert keyword_stem('powers') == 'power'
+    assert keyword_stem('election') == 'election'
+    assert keyword_stem('chess') == 'chess'
+
+
+def test_only_the_last_phrase_word_is_a_prefix():
+    m = KeywordMatcher({'scifi': ['sci-fi'], 'horror': ['serial killer']})
+    assert m.find('a sci-fi film') == ['scifi']
+    assert m.find('scientists find a cure') == []
+    assert m.find('serialized killers') == []